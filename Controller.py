@@ -44,7 +44,8 @@ class Controller():
     self.PRI_SIZE = 512
     self.PRI_PAGES = self.PRI_SIZE // self.PAGE_SIZE
 
-    self.config = Configuration(self.PRI_SIZE, self.PRI_PAGES, self.SEC_SIZE)
+    self.config = Configuration(self.PRI_SIZE, self.PRI_PAGES, self.SEC_SIZE,
+                                _logicalAddressBits=(self.ADD_SIZE - 1).bit_length())
     self.sim = Simulator(self.config)
 
     self.app = QApplication(sys.argv)
@@ -74,7 +75,8 @@ class Controller():
       self.PRI_SIZE = msg.pri_size
       self.PRI_PAGES = self.PRI_SIZE // self.PAGE_SIZE
 
-      self.config = Configuration(self.PRI_SIZE, self.PRI_PAGES, self.SEC_SIZE)
+      self.config = Configuration(self.PRI_SIZE, self.PRI_PAGES, self.SEC_SIZE,
+                                  _logicalAddressBits=(self.ADD_SIZE - 1).bit_length())
       self.sim = Simulator(self.config)
       self.sim.connectFunction(self.simulatorEvent)
 
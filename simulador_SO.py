@@ -1,6 +1,72 @@
-import decimal
+import bisect
+import heapq
 import math
-from typing import Any
+import mmap
+import random
+import sys
+import zlib
+from array import array
+from collections import OrderedDict, deque
+
+# Semente base padrão dos geradores aleatórios (latência dos dispositivos, TLB com substituição
+# aleatória): sem uma semente explícita, duas execuções do mesmo input dão o mesmo resultado
+DEFAULT_SEED = 0
+
+# Mensagens do simulador: tudo passa por um 'sink' de eventos com nível, em vez de print().
+# O texto só é montado (message % args) se o sink atual for usar a mensagem
+DEBUG = 10  # detalhes de cada operação de memória (alocação, faltas, despejos...)
+INFO = 20  # andamento da simulação (instruções, processos, E/S) e relatórios
+WARNING = 30  # pedidos inválidos (processo/segmento inexistente, endereço fora do espaço...)
+
+
+class EventSink:
+    # Destino das mensagens. Quem chama usa log(), que testa enabled() antes de formatar
+    def __init__(self, level=DEBUG):
+        self.level = level
+
+    def enabled(self, level):
+        return level >= self.level
+
+    def emit(self, level, message):
+        raise NotImplementedError
+
+
+class NullSink(EventSink):
+    # Descarta tudo (execuções sem console/em lote): nenhuma mensagem chega a ser formatada
+    def enabled(self, level):
+        return False
+
+    def emit(self, level, message):
+        pass
+
+
+class TextSink(EventSink):
+    # Escreve as mensagens no console, como os print() de antes (ou em 'stream', se dado)
+    def __init__(self, level=DEBUG, stream=None):
+        super().__init__(level)
+        self.stream = stream
+
+    def emit(self, level, message):
+        print(message, file=self.stream)
+
+
+# Sem destino definido, as mensagens são descartadas: quem importa o módulo (a GUI, testes, outros
+# programas) não paga a formatação. O console (main) liga um TextSink
+eventSink = NullSink()
+
+
+def setEventSink(sink):
+    # Troca o destino das mensagens; retorna o anterior (para restaurar depois)
+    global eventSink
+    previous = eventSink
+    eventSink = sink
+    return previous
+
+
+def log(level, message, *args):
+    if eventSink.enabled(level):
+        eventSink.emit(level, message % args if args else message)
+
 
 # Classes abaixo são referentes à memória virtual/paginação
 
@@ -30,130 +96,491 @@ class PCB:
 
 
 class Process:
-    def __init__(self, name, state, sizeInInts, configuration):
+    __slots__ = ('name', 'state', 'size', 'configuration', 'pageTable', 'residentFrames', 'swappedPages',
+                 'numberOfPages', 'sharedPages', 'segments')
+
+    def __init__(self, name, state, sizeInInts, configuration, parent=None):
         self.name = name
         self.state = state
         self.size = sizeInInts
         self.configuration = configuration
-        # Cria as páginas do processo ao ser instanciado
-        self.pageTable = self.createPages()
+        self.residentFrames = set()  # quadros da MP ocupados pelo processo (mantido pela Memory)
+        self.swappedPages = set()  # páginas do processo com slot no swap da MS
+        self.numberOfPages = math.ceil(sizeInInts / configuration.numberOfIntsPerFrame)
+        self.sharedPages = {}  # página compartilhada -> id dela na tabela deste processo
+        self.segments = {}  # segmento compartilhado anexado -> página virtual base
+        # Cria as páginas do processo ao ser instanciado (ou compartilha as do pai, num fork)
+        if parent is not None:
+            self.pageTable = self.forkPages(parent)
+        else:
+            self.pageTable = self.createPages()
+
+    def forkPages(self, parent):
+        # Fork com copy-on-write: a tabela do filho aponta para as mesmas páginas (e quadros) do pai,
+        # que passam a ser compartilhadas até a primeira escrita
+        pt = self.configuration.newPageTable(self)
+        self.pageTable = pt
+        MP = self.configuration.MP
+        amount = 0
+        for page in list(parent.pageTable.pages()):
+            if page.segment is not None:  # segmentos são anexados ao filho, não copiados
+                continue
+            MP.sharePage(page, self, page.id)
+            pt.storeEntry(page)
+            amount += 1
+        MP.pagesSharedByFork += amount
+        for segment, base in list(parent.segments.items()):
+            segment.attach(self, base)
+        log(INFO, '\n<<Process %s shares %s pages with %s>>', self.name, amount, parent.name)
+        return pt
 
     def createPages(self):
-        pt = PageTable()  # Inicializa a tabela de páginas
-        amount_of_pages_needed = math.ceil(
-            self.size / self.configuration.numberOfIntsPerFrame)
+        pt = self.configuration.newPageTable(self)  # Inicializa a tabela de páginas (no layout escolhido)
+        # já associa a tabela ao processo, pois a alocação pode retirar páginas do próprio processo da MP
+        self.pageTable = pt
+        amount_of_pages_needed = self.numberOfPages
         # Calcula a quantidade de páginas necessárias para o processo
 
-        print('\nCreating ' + str(amount_of_pages_needed) +
-              ' pages for ' + self.name + '...')
+        if self.configuration.demandPaging:
+            # Paginação por demanda: os slots do swap já foram reservados pelo Simulator (O(1));
+            # cada página é criada (vazia) e trazida para a MP no primeiro acesso
+            log(INFO, '\nReserving %s pages for %s (demand paging)...', amount_of_pages_needed, self.name)
+            return pt
+
+        log(INFO, '\nCreating %s pages for %s...', amount_of_pages_needed, self.name)
         for i in range(amount_of_pages_needed):
             p = Page(self.configuration.numberOfIntsPerFrame,
                      self, i + 1)  # Cria uma nova página
             address = self.configuration.MP.allocatePage(
                 p)  # Aloca a página na memória principal
-            print('Allocated page at memory address ' + str(address))
+            log(DEBUG, 'Allocated page at memory address %s', address)
             pt.insertPage(p, address)  # Insere a página na tabela de páginas
-        print('\n<<Process ' + self.name + ' occupies a total of ' +
-              str(amount_of_pages_needed) + ' frames>>')
+        log(INFO, '\n<<Process %s occupies a total of %s frames>>', self.name, amount_of_pages_needed)
         return pt  # Retorna a tabela de páginas do processo
 
+    def getPage(self, pageId):
+        # Página do processo com o id dado (trazendo-a para a MP se preciso).
+        # Na paginação por demanda a página só passa a existir no primeiro acesso (falta de página)
+        if self.configuration.demandPaging and self.pageTable.entry(pageId) is None:
+            self.materializePage(pageId)
+        return self.pageTable.getPage(pageId, self.configuration.MP)
+
+    def materializePage(self, pageId):
+        # Cria (vazia) uma página ainda não tocada do processo, fora da MP (paginação por demanda)
+        if not (self.configuration.demandPaging and 1 <= pageId <= self.numberOfPages):
+            return None
+        log(DEBUG, ' First touch of page %s-(%s), zero-filling it.', self.name, pageId)
+        page = Page(self.configuration.numberOfIntsPerFrame, self, pageId)
+        self.pageTable.insertPage(page, None)
+        return page
+
     def endProcess(self):
-        for p in self.pageTable.pageTable:
-            pageFrame = self.pageTable.getFrame(p, config.MP)
-            if not (pageFrame == None):  # (Se estava na MP )
-                pageFrame.liberatePage()
-                self.pageTable.removePageFromMP(p)
-            else:
-                self.config.MP.handlePageFaultById(p)
-                # fazer código para remover em MS também
+        # Libera exatamente os quadros e slots de swap do processo, sem varrer a tabela de páginas
+        for page, pageId in list(self.sharedPages.items()):  # páginas compartilhadas continuam com os outros
+            self.configuration.MP.dropMapping(page, self, pageId)
+        for address in list(self.residentFrames):
+            self.configuration.MP.releaseFrame(address)
+        for page in list(self.swappedPages):
+            self.configuration.MS.freePage(page)
+        for segment in list(self.segments):  # as páginas de segmento já foram liberadas/passadas acima
+            segment.detached(self)
+        if self.configuration.demandPaging:  # reservados pelo Simulator na criação (ou no fork)
+            self.configuration.MS.releaseReservation(self.numberOfPages)
+        if self.configuration.MP.readahead is not None:
+            self.configuration.MP.readahead.processEnded(self)
+        if self.configuration.MP.loadControl is not None:
+            self.configuration.MP.loadControl.processEnded(self)
+        if self.configuration.MP.compressedPool is not None:
+            self.configuration.MP.compressedPool.processEnded(self)
+
+
+# Valor 'vazio' de uma posição de página (as páginas guardam inteiros de 64 bits num array('q'))
+EMPTY = -2**63
+PAGE_INT_MIN = EMPTY + 1  # menor valor que uma escrita pode guardar (EMPTY é reservado)
+PAGE_INT_MAX = 2**63 - 1
 
 
 class Page:
-    inMainMemory = False
-    dirty = False #dirty verdadeiro se alguma operação se write é feita e página está na MP
-                  #qdo a pagina sair da MP, este bit dirty indica se é nescessário reescrever o contéudo da página para a MS
+    __slots__ = ('size', 'process', 'data', 'id', 'frameAddress', 'dirty', 'swapSlot', 'swapValid',
+                 'mappings', 'segment')
 
     def __init__(self, _size, _process, _id):  # dado um array data and a int size
         self.size = _size
         self.process = _process
-        # inicializa um array vazio com tamanho até _size
-        self.data = [None]*_size
+        # inicializa um array vazio (compacto, de inteiros de 64 bits) com tamanho até _size
+        self.data = emptyPageData(_size)[:]
         self.id = _id
+        self.frameAddress = None  # quadro da MP onde a página está (None se não está na MP)
+        self.dirty = False #dirty verdadeiro se alguma operação se write é feita e página está na MP
+                           #qdo a pagina sair da MP, este bit dirty indica se é nescessário reescrever o contéudo da página para a MS
+        self.swapSlot = None  # slot da página no arquivo de swap da MS (None se ainda não tem)
+        self.swapValid = False  # True se o slot guarda o conteúdo atual da página
+        # (processo, id da página) de todos que mapeiam a página, se ela é compartilhada
+        # (None: página privada, mapeada só por (process, id))
+        self.mappings = None
+        self.segment = None  # segmento compartilhado da página (páginas de segmento não são copy-on-write)
+
+    def mappingList(self):
+        if self.mappings is None:
+            return ((self.process, self.id),)
+        return self.mappings
+
+    @property
+    def inMainMemory(self):
+        return self.frameAddress is not None
+
+    def readData(self, offset):
+        # Retorna o valor na posição (None se a posição está vazia)
+        value = self.data[offset]
+        if value == EMPTY:
+            return None
+        return value
 
     def insertNewData(self, _data):  # on top of old data
         j = 0
         for i in range(len(self.data)):
-            if (self.data[i] != None):
+            if (self.data[i] != EMPTY):
                 self.data[i] = _data[j]
                 j += 1
                 if (j == len(_data)):
                     break
 
     def fillWithNewData(self, _data):  # on top of old data
-        self.data = [None]*self.size
+        self.data = emptyPageData(self.size)[:]
         for i in range(len(_data)):
             self.data[i] = _data[i]
 
     def toString(self):
         return (self.process.name + '-(' + str(self.id) + ')')
+
+    def __str__(self):  # usado nas mensagens de log()
+        return self.toString()
     
     def toStringFull(self):
-        return (self.process.name + '-(' + str(self.id) + ')  ->Data: ' + str(self.data).replace('None','_').replace(',',''))
+        return (self.process.name + '-(' + str(self.id) + ')  ->Data: [' +
+                ' '.join('_' if v == EMPTY else str(v) for v in self.data) + ']')
+
+
+EMPTY_PAGE_ITEMSIZE = array('q').itemsize  # bytes por inteiro de uma página
+
+
+# Cache dos bytes de uma página vazia para cada tamanho (evita recriar a lista a cada página)
+EMPTY_PAGES = {}
+
+
+def emptyPageData(size):
+    data = EMPTY_PAGES.get(size)
+    if data is None:
+        data = EMPTY_PAGES[size] = array('q', [EMPTY])*size
+    return data
 
 
-class PageTable:  # apge table é um dicionario que associa a página desejada a sua localização na MP
+PTE_BYTES = 8  # tamanho (simulado) de uma entrada de tabela de páginas
+
+
+class PageTable:  # apge table é um dicionario que associa o id da página à sua entrada (a própria página),
+    # que guarda a localização da página na MP (frameAddress, None se não estiver na MP)
+    # Esta é a tabela 'plana' (uma entrada por página do processo); as outras organizações
+    # (MultiLevelPageTable, HashedPageTable) só trocam storeEntry/entry/lookup/pages/overheadBytes
+    __slots__ = ('pageTable', 'lookups', 'lookupAccesses')
+    layout = 'flat'
+
     def __init__(self):
-        self.pages = []  # remover essa lista depois, pois a page table não guarda o contéudo das páginas em si
         self.pageTable = {}
+        self.lookups = 0  # traduções feitas
+        self.lookupAccesses = 0  # acessos à memória gastos nessas traduções
+
+    def storeEntry(self, page, pageId=None):
+        # pageId: id da página nesta tabela, se for diferente de page.id (página compartilhada)
+        if pageId is None:
+            pageId = page.id
+        self.pageTable[pageId] = page
+
+    def removeEntry(self, pageId):
+        self.pageTable.pop(pageId, None)
+
+    def entry(self, pageId):
+        # Entrada da página (sem contar como tradução), ou None se não pertence ao processo
+        return self.pageTable.get(pageId)
+
+    def lookup(self, pageId):
+        # Tradução: uma entrada da tabela plana custa um acesso à memória
+        self.lookups += 1
+        self.lookupAccesses += 1
+        return self.pageTable.get(pageId)
+
+    def pages(self):
+        return self.pageTable.values()
+
+    def overheadBytes(self):
+        return len(self.pageTable)*PTE_BYTES
+
+    def directoryBytes(self):
+        # Parte de overheadBytes que é diretório em software (só no layout invertido)
+        return 0
+
+    def averageLookupCost(self):
+        if self.lookups == 0:
+            return 0.0
+        return self.lookupAccesses / self.lookups
+
+    def stats(self):
+        return {'layout': self.layout, 'overheadBytes': self.overheadBytes(),
+                'directoryBytes': self.directoryBytes(),
+                'lookups': self.lookups, 'averageLookupCost': self.averageLookupCost()}
 
     def insertPage(self, page, adress):
-        self.pages.append(page)
-        self.pageTable[page.id] = adress
-        # essa linha adiciona uma entry no dicionario que associa
-        # o id da página em questão ao seu adress na MP
+        page.frameAddress = adress
+        self.storeEntry(page)
+        # essa linha adiciona uma entry na tabela que associa
+        # o id da página em questão à página (e portanto ao seu adress na MP)
 
     def changePageAdress(self, page, newAdress):
-        self.pageTable[page.id] = newAdress
+        page.frameAddress = newAdress
 
     def removePageFromMP(self, pageId):
-        self.pageTable[pageId] = None
+        self.entry(pageId).frameAddress = None
 
     def checkIfPageInMP(self, pageId):
-        if (self.pageTable[pageId] == None):
+        if (self.entry(pageId).frameAddress == None):
             return False
         return True
 
     def get_MP_Adress_For_Page(self, pageId):
-        return self.pageTable[pageId+1]
+        return self.entry(pageId+1).frameAddress
 
     def getFrame(self, pageId, MP):
-        return MP.frames[(self.pageTable[pageId])]
+        return MP.frames[(self.entry(pageId).frameAddress)]
 
     def getPage(self, pageId, MP):
-        desiredPage = MP.frames[(self.pageTable[pageId])].page
-        if(desiredPage == None):
-            return MP.handlePageFaultById(pageId)
+        page = self.lookup(pageId)
+        if(page == None):  # endereço fora do espaço do processo
+            log(WARNING, ' Page %s is not mapped for this process.', pageId)
+            return None
+        if(page.frameAddress == None):  # página não está na MP: falta de página
+            return MP.handlePageFault(page)
         else:
-            return desiredPage
+            MP.touchPage(page)  # hit: atualiza a política de substituição
+            return page
 
     def isPageInMemory(self, page_id):
         # Verifica se a página com o ID especificado está na memória principal.
-        if self.pageTable.get(page_id) is not None:
+        page = self.entry(page_id)
+        if page is not None and page.frameAddress is not None:
             return True
         return False
 
 
+class MultiLevelPageTable(PageTable):
+    # Tabela de páginas em árvore (radix) de 2 ou 3 níveis: o número da página virtual é dividido
+    # em pedaços, um por nível, e os nós internos só são criados quando alguma página abaixo deles
+    # é inserida. Cada tradução custa um acesso por nível
+    __slots__ = ('levels', 'bitsPerLevel', 'root', 'nodes')
+    layout = 'multilevel'
+
+    def __init__(self, _virtualPageBits, _levels=2):
+        super().__init__()
+        if _levels not in (2, 3):
+            raise ValueError('Multi-level page tables must have 2 or 3 levels')
+        self.levels = _levels
+        self.bitsPerLevel = max(1, math.ceil(_virtualPageBits / _levels))
+        self.root = {}
+        self.nodes = 1  # nós alocados (incluindo a raiz)
+
+    def indexes(self, pageId):
+        # o índice da raiz não é mascarado, para páginas além do tamanho do processo (segmentos anexados)
+        mask = (1 << self.bitsPerLevel) - 1
+        path = [(pageId >> (self.bitsPerLevel*(self.levels - 1 - level))) & mask
+                for level in range(1, self.levels)]
+        return [pageId >> (self.bitsPerLevel*(self.levels - 1))] + path
+
+    def storeEntry(self, page, pageId=None):
+        if pageId is None:
+            pageId = page.id
+        node = self.root
+        path = self.indexes(pageId)
+        for index in path[:-1]:
+            child = node.get(index)
+            if child is None:  # nó criado só quando é tocado
+                child = node[index] = {}
+                self.nodes += 1
+            node = child
+        node[path[-1]] = page
+
+    def removeEntry(self, pageId):
+        node = self.root
+        path = self.indexes(pageId)
+        for index in path[:-1]:
+            node = node.get(index)
+            if node is None:
+                return
+        node.pop(path[-1], None)
+
+    def entry(self, pageId):
+        node = self.root
+        for index in self.indexes(pageId):
+            node = node.get(index)
+            if node is None:
+                return None
+        return node
+
+    def lookup(self, pageId):
+        self.lookups += 1
+        self.lookupAccesses += self.levels
+        return self.entry(pageId)
+
+    def pages(self):
+        stack = [(self.root, 1)]
+        while stack:
+            node, level = stack.pop()
+            if level == self.levels:
+                yield from node.values()
+            else:
+                for child in node.values():
+                    stack.append((child, level + 1))
+
+    def overheadBytes(self):
+        # cada nó alocado ocupa uma 'página' de 2^bitsPerLevel entradas
+        return self.nodes*(1 << self.bitsPerLevel)*PTE_BYTES
+
+
+class InvertedPageTable:
+    # Tabela de páginas invertida global, com uma entrada por quadro da MP (não cresce com o
+    # tamanho dos processos). A busca é por hash de (processo, página), com as colisões
+    # encadeadas pelos próprios quadros
+    def __init__(self, _frameQuantity):
+        self.frameQuantity = _frameQuantity
+        self.hashSize = max(1, _frameQuantity)
+        self.anchors = [-1]*self.hashSize  # hash -> primeiro quadro da cadeia
+        self.next = [-1]*_frameQuantity  # quadro -> próximo quadro da mesma cadeia
+        self.owners = [None]*_frameQuantity  # quadro -> (processo, id da página, página)
+
+    def hashOf(self, process, pageId):
+        return hash((id(process), pageId)) % self.hashSize
+
+    def insert(self, process, pageId, address, page):
+        h = self.hashOf(process, pageId)
+        self.owners[address] = (process, pageId, page)
+        self.next[address] = self.anchors[h]
+        self.anchors[h] = address
+
+    def remove(self, process, pageId, address):
+        h = self.hashOf(process, pageId)
+        previous = -1
+        current = self.anchors[h]
+        while current != -1:
+            if current == address:
+                if previous == -1:
+                    self.anchors[h] = self.next[current]
+                else:
+                    self.next[previous] = self.next[current]
+                break
+            previous = current
+            current = self.next[current]
+        self.owners[address] = None
+        self.next[address] = -1
+
+    def lookup(self, process, pageId):
+        # Retorna (página ou None, entradas visitadas)
+        probes = 1  # o acesso à âncora
+        current = self.anchors[self.hashOf(process, pageId)]
+        while current != -1:
+            probes += 1
+            owner = self.owners[current]
+            if owner[0] is process and owner[1] == pageId:
+                return owner[2], probes
+            current = self.next[current]
+        return None, probes
+
+    def overheadBytes(self):
+        # âncoras + uma entrada (dono + próximo) por quadro
+        return (self.hashSize + 2*self.frameQuantity)*PTE_BYTES
+
+
+class HashedPageTable(PageTable):
+    # Visão de um processo sobre a tabela invertida global: as traduções das páginas na MP são
+    # buscadas na tabela invertida. As páginas fora da MP ficam no diretório do processo (o que
+    # o SO guarda em software para achar a página no swap), que não é tabela de páginas de hardware
+    __slots__ = ('process', 'inverted')
+    layout = 'inverted'
+
+    def __init__(self, _process, _inverted):
+        super().__init__()
+        self.process = _process
+        self.inverted = _inverted
+
+    def lookup(self, pageId):
+        page, probes = self.inverted.lookup(self.process, pageId)
+        self.lookups += 1
+        self.lookupAccesses += probes
+        if page is None:  # não está na MP: procura a página no diretório do processo
+            page = self.pageTable.get(pageId)
+        return page
+
+    def overheadBytes(self):
+        # a tabela invertida é global (ver InvertedPageTable.overheadBytes); aqui só conta o
+        # diretório do processo, que tem uma entrada por página e cresce com o tamanho do processo
+        return self.directoryBytes()
+
+    def directoryBytes(self):
+        return len(self.pageTable)*PTE_BYTES
+
+
+PAGE_TABLE_LAYOUTS = ('flat', 'multilevel', 'inverted')
+
+
+class FrameAllocator:
+    # Alocador de quadros: lista de quadros livres + bitmap de ocupação + contador de ocupados
+    # Alocar, liberar e checar se a memória está cheia são todos O(1)
+    def __init__(self, _frameQuantity):
+        self.frameQuantity = _frameQuantity
+        self.free = [True]*_frameQuantity  # bitmap: True se o quadro está livre
+        # pilha de quadros livres, invertida para que o quadro 0 seja o primeiro a ser entregue
+        self.freeList = list(range(_frameQuantity - 1, -1, -1))
+        self.usedFrames = 0
+
+    def markUsed(self, address):
+        if self.free[address]:
+            self.free[address] = False
+            self.usedFrames += 1
+            # o endereço fica 'velho' na freeList e é descartado no próximo pop
+
+    def markFree(self, address):
+        if not self.free[address]:
+            self.free[address] = True
+            self.usedFrames -= 1
+            self.freeList.append(address)
+
+    def popFreeFrame(self):
+        # Retorna o endereço de um quadro livre (ou None se a memória está cheia)
+        while self.freeList:
+            address = self.freeList.pop()
+            if self.free[address]:
+                return address
+        return None
+
+    def isFull(self):
+        return self.usedFrames == self.frameQuantity
+
+
 class Frame:
-    def __init__(self, sizeInInts, memAddress):
+    __slots__ = ('page', 'size', 'memoryAdress', 'allocator')
+
+    def __init__(self, sizeInInts, memAddress, allocator=None):
         self.page = None
         self.size = sizeInInts
         self.memoryAdress = memAddress
+        self.allocator = allocator  # alocador da memória dona do quadro (mantido atualizado aqui)
 
     def assignPage(self, _page):
         self.page = _page
+        if self.allocator is not None:
+            self.allocator.markUsed(self.memoryAdress)
 
     def liberatePage(self):
         self.page = None
+        if self.allocator is not None:
+            self.allocator.markFree(self.memoryAdress)
 
     def isOccupied(self):
         if (self.page == None):
@@ -161,223 +588,2005 @@ class Frame:
         return True
 
 
+class SharedSegment:
+    # Segmento de memória compartilhada nomeado (tipo shmget/shmat/shmdt): as mesmas páginas
+    # físicas aparecem nas tabelas de vários processos, em endereços virtuais diferentes.
+    # A contagem de referências de cada página é a sua lista de mapeamentos: o quadro e o slot
+    # do swap só são liberados quando o último processo se desanexa (ou termina)
+    def __init__(self, _name, _sizeInInts, _configuration):
+        self.name = _name
+        self.size = _sizeInInts
+        self.configuration = _configuration
+        self.numberOfPages = math.ceil(_sizeInInts / _configuration.numberOfIntsPerFrame)
+        self.pages = None  # criadas (vazias, fora da MP) no primeiro attach
+        self.attachments = {}  # processo -> página virtual base (as páginas são base+1 .. base+n)
+
+    def defaultBase(self, process):
+        # Primeira página virtual livre depois das páginas do processo e dos segmentos já anexados
+        base = process.numberOfPages
+        for segment, segmentBase in process.segments.items():
+            base = max(base, segmentBase + segment.numberOfPages)
+        return base
+
+    def attach(self, process, base=None):
+        if process in self.attachments:
+            log(WARNING, ' Segment %s is already attached to %s.', self.name, process.name)
+            return False
+        if base is None:
+            base = self.defaultBase(process)
+        pageIds = range(base + 1, base + self.numberOfPages + 1)
+        bits = self.configuration.logicalAddressBits
+        if bits is not None and pageIds[-1]*self.configuration.numberOfIntsPerFrame > (1 << bits):
+            log(WARNING, ' Segment %s does not fit in the logical address space of %s.',
+                self.name, process.name)
+            return False
+        for pageId in pageIds:
+            if pageId <= process.numberOfPages or process.pageTable.entry(pageId) is not None:
+                log(WARNING, ' Virtual page %s of %s is already in use.', pageId, process.name)
+                return False
+        MP = self.configuration.MP
+        if self.pages is None:
+            self.pages = []
+            for pageId in pageIds:
+                page = Page(self.configuration.numberOfIntsPerFrame, process, pageId)
+                page.segment = self
+                process.pageTable.insertPage(page, None)
+                self.pages.append(page)
+        else:
+            for page, pageId in zip(self.pages, pageIds):
+                MP.sharePage(page, process, pageId)
+                process.pageTable.storeEntry(page, pageId)
+        self.attachments[process] = base
+        process.segments[self] = base
+        log(INFO, ' Segment %s attached to %s at virtual address %s (%s users).',
+            self.name, process.name, base*self.configuration.numberOfIntsPerFrame, len(self.attachments))
+        return True
+
+    def detach(self, process):
+        if process not in self.attachments:
+            log(WARNING, ' Segment %s is not attached to %s.', self.name, process.name)
+            return False
+        base = self.attachments[process]
+        MP = self.configuration.MP
+        for i, page in enumerate(self.pages):
+            pageId = base + i + 1
+            if page.mappings is not None:
+                MP.dropMapping(page, process, pageId)
+            else:  # último usuário: a página sai de vez
+                MP.freePage(page)
+            process.pageTable.removeEntry(pageId)
+        self.detached(process)
+        log(INFO, ' Segment %s detached from %s (%s users left).',
+            self.name, process.name, len(self.attachments))
+        return True
+
+    def detached(self, process):
+        # Só a contabilidade do segmento (as páginas já foram desmapeadas do processo)
+        del self.attachments[process]
+        del process.segments[self]
+        if not self.attachments:  # sem usuários: o segmento deixa de existir
+            del self.configuration.MP.sharedSegments[self.name]
+            if self.configuration.demandPaging:
+                self.configuration.MS.releaseReservation(self.numberOfPages)
+
+
+# Políticas de substituição de páginas
+# Todas seguem a mesma interface (ReplacementPolicy), e a Memory só conversa com ela:
+#   insert(page, address) -> página passou a ocupar o quadro 'address'
+#   touch(page)           -> acesso a uma página que já está na MP (hit)
+#   selectVictim(page)    -> escolhe a página que vai sair da MP para dar lugar a 'page'
+#   evict(page)           -> a vítima escolhida saiu da MP
+#   remove(page)          -> página saiu da MP sem ser vítima (ex: fim do processo)
+#   remapped(page)        -> página na MP ganhou ou perdeu um mapeamento (fork, segmento, cópia na escrita)
+
+
+class ReplacementPolicy:
+    name = 'BASE'
+
+    def __init__(self, capacity):
+        self.capacity = capacity  # quantidade de quadros da MP
+        self.hits = 0
+        self.faults = 0
+        self.evictions = 0
+
+    def prepare(self, input, pageSizeInInts):
+        # Chamado com o input completo antes da simulação (usado por políticas offline)
+        self.pageSizeInInts = pageSizeInInts
+
+    def advance(self, instruction):
+        # Chamado antes de cada instrução ser executada
+        pass
+
+    def recordFault(self, page):
+        self.faults += 1
+
+    def insert(self, page, address):
+        raise NotImplementedError
+
+    def touch(self, page):
+        self.hits += 1
+
+    def selectVictim(self, incomingPage):
+        raise NotImplementedError
+
+    def evict(self, page):
+        self.evictions += 1
+        self.remove(page)
+
+    def remove(self, page):
+        raise NotImplementedError
+
+    def remapped(self, page):
+        pass
+
+    def stats(self):
+        return {'policy': self.name, 'hits': self.hits,
+                'faults': self.faults, 'evictions': self.evictions}
+
+    def printStats(self):
+        log(INFO, 'Replacement policy %s: %s hits, %s faults, %s evictions.',
+            self.name, self.hits, self.faults, self.evictions)
+
+
+class LRUPolicy(ReplacementPolicy):
+    # Lista LRU baseada em OrderedDict: a primeira página é a menos recentemente usada
+    # Inserção, promoção, remoção e escolha da vítima são todas O(1)
+    name = 'LRU'
+
+    def __init__(self, capacity):
+        super().__init__(capacity)
+        self.order = OrderedDict()
+
+    def insert(self, page, address):
+        self.order[page] = None
+        self.order.move_to_end(page)
+
+    def touch(self, page):
+        super().touch(page)
+        if page in self.order:
+            self.order.move_to_end(page)
+
+    def selectVictim(self, incomingPage):
+        if not self.order:
+            return None
+        return next(iter(self.order))
+
+    def remove(self, page):
+        self.order.pop(page, None)
+
+    def __len__(self):
+        return len(self.order)
+
+
+class FIFOPolicy(LRUPolicy):
+    # Igual ao LRU, mas o acesso não muda a ordem: sai sempre a página mais antiga na MP
+    name = 'FIFO'
+
+    def touch(self, page):
+        ReplacementPolicy.touch(self, page)
+
+
+class SecondChancePolicy(ReplacementPolicy):
+    # FIFO com bit de referência: a página mais antiga só sai se não foi referenciada,
+    # senão o bit é zerado e ela volta para o fim da fila (O(1) amortizado)
+    name = 'SECOND_CHANCE'
+
+    def __init__(self, capacity):
+        super().__init__(capacity)
+        self.queue = OrderedDict()  # página -> bit de referência
+
+    def insert(self, page, address):
+        self.queue[page] = False
+
+    def touch(self, page):
+        super().touch(page)
+        if page in self.queue:
+            self.queue[page] = True
+
+    def selectVictim(self, incomingPage):
+        while self.queue:
+            page, referenced = next(iter(self.queue.items()))
+            if not referenced:
+                return page
+            self.queue[page] = False
+            self.queue.move_to_end(page)
+        return None
+
+    def remove(self, page):
+        self.queue.pop(page, None)
+
+
+class ClockPolicy(ReplacementPolicy):
+    # Relógio: um ponteiro varre os quadros em círculo, zerando os bits de referência
+    # até achar um quadro com bit 0 (no máximo duas voltas, O(1) amortizado)
+    name = 'CLOCK'
+
+    def __init__(self, capacity):
+        super().__init__(capacity)
+        self.ring = [None]*capacity  # quadro -> página
+        self.referenced = [False]*capacity
+        self.addressOf = {}  # página -> quadro
+        self.hand = 0
+
+    def insert(self, page, address):
+        self.ring[address] = page
+        self.referenced[address] = False
+        self.addressOf[page] = address
+
+    def touch(self, page):
+        super().touch(page)
+        address = self.addressOf.get(page)
+        if address is not None:
+            self.referenced[address] = True
+
+    def selectVictim(self, incomingPage):
+        if not self.addressOf:
+            return None
+        while True:
+            address = self.hand
+            self.hand = (self.hand + 1) % self.capacity
+            page = self.ring[address]
+            if page is None:
+                continue
+            if self.referenced[address]:
+                self.referenced[address] = False
+            else:
+                return page
+
+    def remove(self, page):
+        address = self.addressOf.pop(page, None)
+        if address is not None:
+            self.ring[address] = None
+            self.referenced[address] = False
+
+
+class LFUPolicy(ReplacementPolicy):
+    # LFU O(1): baldes de frequência (contagem -> OrderedDict) e a menor contagem guardada.
+    # Envelhecimento: a cada 'agingInterval' acessos todas as contagens são divididas por 2,
+    # o que custa O(n) a cada n acessos, ou seja O(1) amortizado
+    name = 'LFU'
+
+    def __init__(self, capacity, agingInterval=None):
+        super().__init__(capacity)
+        self.counts = {}  # página -> contagem
+        self.buckets = {}  # contagem -> OrderedDict de páginas (a primeira é a mais antiga)
+        self.minCount = 1
+        self.agingInterval = agingInterval or max(capacity, 1)*4
+        self.accessesSinceAging = 0
+
+    def addToBucket(self, page, count):
+        self.counts[page] = count
+        self.buckets.setdefault(count, OrderedDict())[page] = None
+
+    def removeFromBucket(self, page):
+        count = self.counts.pop(page)
+        bucket = self.buckets[count]
+        del bucket[page]
+        if not bucket:
+            del self.buckets[count]
+        return count
+
+    def insert(self, page, address):
+        self.addToBucket(page, 1)
+        self.minCount = 1
+        self.age()
+
+    def touch(self, page):
+        super().touch(page)
+        if page in self.counts:
+            count = self.removeFromBucket(page)
+            self.addToBucket(page, count + 1)
+            if count == self.minCount and count not in self.buckets:
+                self.minCount = count + 1
+            self.age()
+
+    def age(self):
+        self.accessesSinceAging += 1
+        if self.accessesSinceAging < self.agingInterval:
+            return
+        self.accessesSinceAging = 0
+        oldBuckets = self.buckets
+        self.buckets = {}
+        for count in sorted(oldBuckets):
+            for page in oldBuckets[count]:
+                self.addToBucket(page, (count + 1)//2)
+        self.minCount = min(self.buckets) if self.buckets else 1
+
+    def selectVictim(self, incomingPage):
+        if not self.counts:
+            return None
+        if self.minCount not in self.buckets:  # contagem mínima desatualizada após remoções
+            self.minCount = min(self.buckets)
+        return next(iter(self.buckets[self.minCount]))
+
+    def remove(self, page):
+        if page in self.counts:
+            self.removeFromBucket(page)
+
+
+class ARCPolicy(ReplacementPolicy):
+    # Adaptive Replacement Cache (Megiddo & Modha): T1 (vistas uma vez) e T2 (vistas mais vezes)
+    # são as páginas na MP; B1 e B2 são 'fantasmas' das que saíram de T1 e T2.
+    # Um hit em B1 aumenta o alvo p do tamanho de T1, um hit em B2 diminui. Tudo O(1)
+    name = 'ARC'
+
+    def __init__(self, capacity):
+        super().__init__(capacity)
+        self.T1 = OrderedDict()
+        self.T2 = OrderedDict()
+        self.B1 = OrderedDict()
+        self.B2 = OrderedDict()
+        self.p = 0
+
+    def recordFault(self, page):
+        super().recordFault(page)
+        # adapta o alvo antes da escolha da vítima, como no algoritmo original
+        if page in self.B1:
+            self.p = min(self.capacity, self.p + max(len(self.B2)//len(self.B1), 1))
+        elif page in self.B2:
+            self.p = max(0, self.p - max(len(self.B1)//len(self.B2), 1))
+
+    def insert(self, page, address):
+        if page in self.B1 or page in self.B2:
+            self.B1.pop(page, None)
+            self.B2.pop(page, None)
+            self.T2[page] = None
+        else:
+            self.T1[page] = None
+        # limita o tamanho das listas fantasmas
+        while self.B1 and len(self.T1) + len(self.B1) > self.capacity:
+            self.B1.popitem(last=False)
+        while self.B2 and len(self.T1) + len(self.T2) + len(self.B1) + len(self.B2) > 2*self.capacity:
+            self.B2.popitem(last=False)
+
+    def touch(self, page):
+        super().touch(page)
+        if page in self.T1:
+            del self.T1[page]
+            self.T2[page] = None
+        elif page in self.T2:
+            self.T2.move_to_end(page)
+
+    def selectVictim(self, incomingPage):
+        if self.T1 and (len(self.T1) > self.p or
+                        (incomingPage in self.B2 and len(self.T1) == self.p) or not self.T2):
+            return next(iter(self.T1))
+        if self.T2:
+            return next(iter(self.T2))
+        return None
+
+    def evict(self, page):
+        self.evictions += 1
+        # a vítima vira fantasma na lista correspondente
+        if page in self.T1:
+            del self.T1[page]
+            self.B1[page] = None
+        elif page in self.T2:
+            del self.T2[page]
+            self.B2[page] = None
+
+    def remove(self, page):
+        for l in (self.T1, self.T2, self.B1, self.B2):
+            l.pop(page, None)
+
+
+class OPTPolicy(ReplacementPolicy):
+    # Ótimo de Belady (offline): sai a página cuja próxima referência está mais longe no futuro.
+    # prepare() percorre o input de trás pra frente uma única vez e guarda, para cada
+    # instrução R/W/P, a posição da próxima referência à mesma (processo, página).
+    # A próxima referência de uma página na MP é a mais próxima entre todos os (processo, página)
+    # que a mapeiam (páginas compartilhadas por fork ou segmento).
+    # As páginas na MP ficam num heap de máximo pela próxima referência (com remoção
+    # preguiçosa), então cada falta custa O(log quadros)
+    name = 'OPT'
+    NEVER = float('inf')  # página que não será mais referenciada
+
+    def __init__(self, capacity):
+        super().__init__(capacity)
+        self.positionOf = {}  # instrução -> posição no input
+        self.nextUse = []  # posição -> próxima referência à mesma página (ou NEVER)
+        self.nextUseAtCreation = {}  # posição de um 'C' -> {id da página: primeira referência}
+        self.upcoming = {}  # (processo, página) -> próxima referência a partir do ponto atual
+        self.resident = set()  # páginas na MP
+        self.heap = []
+        self.counter = 0  # desempate no heap
+
+    def prepare(self, input, pageSizeInInts):
+        super().prepare(input, pageSizeInInts)
+        instructions = input.instructions
+        self.positionOf = {}
+        self.nextUse = [self.NEVER]*len(instructions)
+        self.nextUseAtCreation = {}
+        # 'C'/'F' de um processo que já existe é recusado pelo simulador e não começa outra encarnação
+        alive = set()
+        creates = set()  # posições dos 'C'/'F' que criam o processo
+        for i, inst in enumerate(instructions):
+            if inst.action == 'T':
+                alive.discard(inst.process_name)
+            elif inst.action in ('C', 'F') and inst.process_name not in alive:
+                if inst.action == 'F' and (not inst.args or inst.args[0] not in alive):
+                    continue
+                alive.add(inst.process_name)
+                creates.add(i)
+        lastSeen = {}  # processo -> {página: posição da referência mais próxima já vista}
+        for i in range(len(instructions) - 1, -1, -1):
+            inst = instructions[i]
+            self.positionOf[inst] = i
+            if inst.action in ('R', 'W', 'P'):
+                seen = lastSeen.setdefault(inst.process_name, {})
+                pageId = int(inst.args[0])//pageSizeInInts + 1
+                self.nextUse[i] = seen.get(pageId, self.NEVER)
+                seen[pageId] = i
+            elif i in creates:
+                # referências anteriores a este 'C' são de outra encarnação do processo
+                self.nextUseAtCreation[i] = lastSeen.pop(inst.process_name, {})
+
+    def advance(self, instruction):
+        position = self.positionOf.get(instruction)
+        if position is None:
+            return
+        if position in self.nextUseAtCreation:
+            for pageId, nextPosition in self.nextUseAtCreation[position].items():
+                self.upcoming[(instruction.process_name, pageId)] = nextPosition
+        elif instruction.action in ('R', 'W', 'P'):
+            # a referência atual foi consumida: a próxima passa a ser a seguinte. A página
+            # referenciada (resolvida pela tabela do processo) é reposta no heap em touch/insert
+            key = (instruction.process_name, int(instruction.args[0])//self.pageSizeInInts + 1)
+            self.upcoming[key] = self.nextUse[position]
+
+    def nextUseOf(self, page):
+        upcoming = self.upcoming
+        return min(upcoming.get((process.name, pageId), self.NEVER) for process, pageId in page.mappingList())
+
+    def push(self, page):
+        self.counter += 1
+        heapq.heappush(self.heap, (-self.nextUseOf(page), self.counter, page))
+        if len(self.heap) > 2*len(self.resident) + self.capacity:
+            # reconstrói o heap só com as entradas válidas (O(1) amortizado)
+            self.heap = []
+            for p in self.resident:
+                self.counter += 1
+                self.heap.append((-self.nextUseOf(p), self.counter, p))
+            heapq.heapify(self.heap)
+
+    def insert(self, page, address):
+        self.resident.add(page)
+        self.push(page)
+
+    def touch(self, page):
+        super().touch(page)
+        self.push(page)
+
+    def remapped(self, page):
+        if page in self.resident:
+            self.push(page)
+
+    def selectVictim(self, incomingPage):
+        while self.heap:
+            negNext, _, page = self.heap[0]
+            if page in self.resident and -negNext == self.nextUseOf(page):
+                return page
+            heapq.heappop(self.heap)  # entrada desatualizada
+            if page in self.resident:  # volta com a próxima referência atual
+                self.push(page)
+        return None
+
+    def remove(self, page):
+        self.resident.discard(page)
+
+
+REPLACEMENT_POLICIES = {
+    'LRU': LRUPolicy,
+    'FIFO': FIFOPolicy,
+    'CLOCK': ClockPolicy,
+    'SECOND_CHANCE': SecondChancePolicy,
+    'LFU': LFUPolicy,
+    'ARC': ARCPolicy,
+    'OPT': OPTPolicy,
+}
+
+
+def makeReplacementPolicy(name, capacity):
+    # Cria a política de substituição a partir do nome (ex: 'LRU', 'CLOCK', 'ARC')
+    try:
+        policyClass = REPLACEMENT_POLICIES[name.upper()]
+    except KeyError:
+        raise ValueError('Unknown replacement policy: ' + str(name) +
+                         ' (available: ' + ', '.join(REPLACEMENT_POLICIES) + ')')
+    return policyClass(capacity)
+
+
 class Memory:
-    def __init__(self, _size, _pageQuantity, _pageSizeInInts, _pageTable):
+    def __init__(self, _size, _pageQuantity, _pageSizeInInts, _replacementPolicy=None):
         # Inicialização da memória com parâmetros recebidos
         self.size = _size
         self.frames = []
+        # Alocador de quadros livres, atualizado pelos próprios quadros
+        self.allocator = FrameAllocator(_pageQuantity)
         # Criação dos quadros de memória (frames)
         for i in range(_pageQuantity):
-            self.frames.append(Frame(_pageSizeInInts, i))
+            self.frames.append(Frame(_pageSizeInInts, i, self.allocator))
         # Exibição de informações sobre a criação da memória
-        print('Creating memory...')
-        print('Size: '+str(len(self.frames)) + ' frames.')
+        log(INFO, 'Creating memory...')
+        log(INFO, 'Size: %s frames.', len(self.frames))
         # Configuração de quantidade de páginas e tamanho por quadro
         self.pageQuantity = _pageQuantity
         self.pageSizeInInts = _pageSizeInInts
-        # Referência para a tabela de páginas
-        self.pageTable = _pageTable
-        # Inicialização dos tempos de acesso para cada página como 0
-        self.access_times = {}
-        for frame in self.frames:
-            if frame.page is not None:
-                self.access_times[frame.page.id] = 0
+        # Mapa reverso: quadro -> (processo, id da página) que o ocupa
+        self.reverseMap = [None]*_pageQuantity
+        # Política de substituição das páginas presentes na MP (LRU por padrão)
+        if _replacementPolicy is None:
+            _replacementPolicy = LRUPolicy(_pageQuantity)
+        self.replacementPolicy = _replacementPolicy
+        # MS onde as páginas que saem da MP são guardadas (ver attachSecondaryMemory)
+        self.secondaryMemory = None
+        # Páginas sujas presentes na MP, da mais antiga para a mais nova
+        self.dirtyPages = {}
+        self.writeBackDaemon = None  # ver Configuration.enableWriteBack
+        self.tlb = None  # ver Configuration.enableTLB
+        self.invertedPageTable = None  # tabela invertida global (só no layout 'inverted')
+        self.readahead = None  # ver Configuration.enableReadahead
+        self.loadControl = None  # ver Configuration.enableLoadControl
+        self.compressedPool = None  # ver Configuration.enableCompressedSwap
+        # estatísticas de compartilhamento (fork com copy-on-write)
+        self.pagesSharedByFork = 0  # páginas que um fork 'ansioso' teria copiado
+        self.sharedSegments = {}  # nome -> SharedSegment
+        self.cowCopies = 0  # páginas realmente copiadas na primeira escrita
+        self.faultPathWrites = 0  # páginas sujas escritas no caminho da falta de página
+
+    def attachSecondaryMemory(self, _secondaryMemory):
+        self.secondaryMemory = _secondaryMemory
+
+    def markDirty(self, page):
+        # Chamado em toda escrita (W) numa página da MP
+        if not page.dirty:
+            page.dirty = True
+            self.dirtyPages[page] = None
+            if self.writeBackDaemon is not None:
+                self.writeBackDaemon.pageDirtied(page)
+
+    def markClean(self, page):
+        page.dirty = False
+        self.dirtyPages.pop(page, None)
 
     def allocatePage(self, p):
         # Exibição da alocação de uma página específica
-        print('\nAllocating Page ' + p.toString() + '...')
-        self.printMemoryStatus()
-
-        # Contagem de quadros usados
-        used_frames = sum(1 for frame in self.frames if frame.isOccupied())
-
-        if used_frames == len(self.frames):
-            # Memória está cheia, vamos tratar a criação de uma nova página
-
-            # Verifica se a página já está na mp
-            if p.inMainMemory:
-                return  # Se a página já estiver na memória, não há necessidade de fazer nada
+        log(DEBUG, '\nAllocating Page %s...', p)
+        if eventSink.enabled(DEBUG):  # varre todos os quadros, só vale a pena se for exibido
+            self.printMemoryStatus()
 
-            # Cria uma nova página
-            new_page = Page(self.pageSizeInInts, None, None)
+        # Verifica se a página já está na mp
+        if p.inMainMemory:
+            return  # Se a página já estiver na memória, não há necessidade de fazer nada
 
-            # Encontre um quadro livre na mp
-            free_frame_address = self.findFreeFrameAndAssignPage(new_page)
-
-            if free_frame_address is None:
-                # Se não há espaço na mp, realiza a lógica de substituição LRU
-                least_recently_used_page = self.findLeastRecentlyUsedPage()
-                self.loadPageFromSecondaryMemory(
-                    least_recently_used_page, new_page)
-            else:
-                # Atualiza os tempos de acesso para refletir a recente utilização da nova página
-                self.access_times[new_page.id] = max(
-                    self.access_times.values(), default=0) + 1
-        else:
-            # Se há espaço disponível na memória, procura um quadro livre ou trata a falta de página
-            for frame in self.frames:
-                if not frame.isOccupied():
-                    # Quadro livre encontrado, atribui a página
-                    print('Found a free frame!')
-                    frame.assignPage(p)
-                    p.inMainMemory = True
-                    # Atualiza tempo de acesso se a página não estiver presente
-                    if p.id not in self.access_times:
-                        self.access_times[p.id] = 0
-                    return frame.memoryAdress
-
-            # Se não há quadros livres, trata a falta de página
-            self.triggerPageFault(p)
+        if self.allocator.isFull():
+            # Memória está cheia, realiza a lógica de substituição da política escolhida
+            return self.loadPageFromSecondaryMemory(p)
+        # Se há espaço disponível na memória, pega um quadro livre
+        return self.findFreeFrameAndAssignPage(p)
 
     def triggerPageFault(self, p):
         # Verifica se a página não está na mp
         if not p.inMainMemory:
             # Imprime uma mensagem informando que a página não está na mp
-            print(f'Page {p.toString()} is not in main memory.')
+            log(DEBUG, 'Page %s is not in main memory.', p)
             # Chama a função para lidar com a falta de página
-            self.handlePageFault(p)
+            return self.handlePageFault(p)
+        return p
 
     def handlePageFault(self, p):
-        missing_page_id = p.id
-
-        # Verifica se a página está ausente na mp utilizando a tabela de páginas
-        if not self.pageTable.isPageInMemory(missing_page_id):
-            print(f'Page {missing_page_id} is missing.')
-
-            # Verifica e identifica a página menos recentemente utilizada (LRU)
-            least_recently_used_page = self.findLeastRecentlyUsedPage()
-
-            # Carrega a página da ms para a mp
-            self.loadPageFromSecondaryMemory(least_recently_used_page, p)
-
-    def handlePageFaultById(self, pageId):
-        missing_page_id = pageId
-
-        # Verifica se a página está ausente na mp utilizando a tabela de páginas
-        if not self.pageTable.isPageInMemory(missing_page_id):
-            print(f'Page {missing_page_id} is missing.')
-
-            # Verifica e identifica a página menos recentemente utilizada (LRU)
-            least_recently_used_page = self.findLeastRecentlyUsedPage()
-
-            if(least_recently_used_page.dirty):
-                print('Page is dirty, writing data to MS...')
-            # Carrega a página da ms para a mp
-            self.loadPageFromSecondaryMemory(
-                least_recently_used_page, missing_page_id)
-
-    def findLeastRecentlyUsedPage(self):
-        # Encontra a página menos recentemente utilizada (LRU) usando o registro de tempo de acesso
-        # Encontra a página que tem o menor tempo de acesso
-        least_recently_used_page = min(
-            self.access_times, key=self.access_times.get)
-        # Retorna a página menos recentemente utilizada
-        return least_recently_used_page
-
-    def loadPageFromSecondaryMemory(self, new_page, another_arg):
-        least_recently_used_page = self.findLeastRecentlyUsedPage()  # Encontra a página LRU
-
-        if least_recently_used_page in self.access_times:
-            # Remove a página LRU da MP e atualiza os tempos de acesso
-            self.pageTable.removePageFromMP(least_recently_used_page)
-            del self.access_times[least_recently_used_page]
-
-        # Verifica se há espaço na mp para alocar a nova página
-        free_frame_address = self.findFreeFrameAndAssignPage(new_page)
-        if free_frame_address is None:
-            # Se não há espaço na mp, realiza a lógica de substituição LRU
-            least_recently_used_page = self.findLeastRecentlyUsedPage()
-            self.loadPageFromSecondaryMemory(
-                least_recently_used_page, new_page)
+        # Verifica se a página está ausente na mp utilizando a tabela de páginas do processo dono
+        if not p.inMainMemory:
+            log(DEBUG, 'Page %s is missing.', p)
+            self.replacementPolicy.recordFault(p)
+            # Carrega a página da ms para a mp (substituindo uma página se necessário)
+            self.loadPageFromSecondaryMemory(p)
+            if self.readahead is not None:
+                self.readahead.pageFaulted(p)
+            if self.loadControl is not None:
+                self.loadControl.pageFaulted(p)
+        return p
+
+    def prefetchPage(self, page, trigger):
+        # Traz a página para a MP antes de ela ser pedida (leitura antecipada, não conta como falta).
+        # Não antecipa nada se para isso tivesse que tirar da MP a própria página que causou a falta
+        log(DEBUG, 'Prefetching page %s...', page)
+        return self.loadPageFromSecondaryMemory(page, trigger) is not None
+
+    def handlePageFaultById(self, pageId, pageTable):
+        # Mesma coisa que handlePageFault, mas a partir do id da página na tabela de páginas dada
+        return self.handlePageFault(pageTable.entry(pageId))
+
+    def findVictimPage(self, incomingPage):
+        # Pergunta à política de substituição qual página deve sair da MP
+        return self.replacementPolicy.selectVictim(incomingPage)
+
+    def touchPage(self, page):
+        # Avisa a política de que a página foi acessada (chamado em todo acesso R/W/P na MP)
+        self.replacementPolicy.touch(page)
+        if self.readahead is not None:
+            self.readahead.pageHit(page)
+
+    def mapPage(self, page, address):
+        # Coloca a página no quadro, atualizando o mapa reverso e o conjunto residente dos processos
+        self.frames[address].assignPage(page)
+        page.frameAddress = address  # atualiza a entrada da tabela de páginas (compartilhada pelos mapeamentos)
+        mappings = page.mappingList()
+        self.reverseMap[address] = mappings
+        for process, pageId in mappings:
+            process.residentFrames.add(address)
+        if self.invertedPageTable is not None:
+            self.invertedPageTable.insert(page.process, page.id, address, page)
+
+    def unmapPage(self, address):
+        # Tira a página do quadro: o mapa reverso diz quais (processo, página) apontavam para ele,
+        # então as entradas certas (as das tabelas dos processos donos) são atualizadas em O(1)
+        page = self.frames[address].page
+        for process, pageId in self.reverseMap[address]:
+            if self.tlb is not None:
+                self.tlb.invalidate(process, pageId)
+            process.pageTable.removePageFromMP(pageId)
+            process.residentFrames.discard(address)
+        if self.invertedPageTable is not None:
+            self.invertedPageTable.remove(page.process, page.id, address)
+        self.reverseMap[address] = None
+        self.frames[address].liberatePage()
+        return page
+
+    def sharePage(self, page, process, pageId):
+        # Mapeia a página também em (process, pageId), sem copiar (ela passa a ser compartilhada)
+        if page.mappings is None:
+            page.mappings = [(page.process, page.id)]
+            page.process.sharedPages[page] = page.id
+            if page.frameAddress is not None:
+                self.reverseMap[page.frameAddress] = page.mappings
+        page.mappings.append((process, pageId))
+        process.sharedPages[page] = pageId
+        if page.frameAddress is not None:
+            process.residentFrames.add(page.frameAddress)
+            self.replacementPolicy.remapped(page)
+
+    def dropMapping(self, page, process, pageId):
+        # Tira o mapeamento (process, pageId) de uma página compartilhada. Se quem sai é o dono,
+        # a página passa para o próximo processo que a mapeia; com um só mapeamento ela volta a ser privada
+        page.mappings.remove((process, pageId))
+        del process.sharedPages[page]
+        address = page.frameAddress
+        if address is not None:
+            process.residentFrames.discard(address)
+            if self.tlb is not None:
+                self.tlb.invalidate(process, pageId)
+        if page.process is process and page.id == pageId:
+            self.transferOwnership(page, *page.mappings[0])
+        if len(page.mappings) == 1:
+            del page.process.sharedPages[page]
+            page.mappings = None
+            if address is not None:
+                self.reverseMap[address] = page.mappingList()
+        if address is not None:
+            self.replacementPolicy.remapped(page)
+
+    def freePage(self, page):
+        # Libera a página de vez (quadro, slot do swap e pool comprimido), sem escrever nada
+        if page.frameAddress is not None:
+            self.releaseFrame(page.frameAddress)
+        if self.compressedPool is not None:
+            self.compressedPool.discard(page)
+        if self.secondaryMemory is not None:
+            self.secondaryMemory.freePage(page)
+
+    def transferOwnership(self, page, process, pageId):
+        address = page.frameAddress
+        if address is not None:
+            self.replacementPolicy.remove(page)
+            if self.invertedPageTable is not None:
+                self.invertedPageTable.remove(page.process, page.id, address)
+        if page.swapSlot is not None:
+            page.process.swappedPages.discard(page)
+            process.swappedPages.add(page)
+        page.process = process
+        page.id = pageId
+        if address is not None:
+            if self.invertedPageTable is not None:
+                self.invertedPageTable.insert(process, pageId, address, page)
+            self.replacementPolicy.insert(page, address)
+
+    def copyOnWrite(self, page, process, pageId):
+        # Primeira escrita de um processo numa página compartilhada: só essa página é copiada
+        log(INFO, ' Page %s is shared, copying it for %s (copy-on-write)...', page, process.name)
+        copy = Page(page.size, process, pageId)
+        copy.data[:] = page.data  # a cópia é feita antes de alocar, que pode tirar a original da MP
+        self.dropMapping(page, process, pageId)
+        process.pageTable.storeEntry(copy)
+        self.cowCopies += 1
+        self.loadPageFromSecondaryMemory(copy)
+        return copy
+
+    def evictPage(self, page):
+        # Retira a página da MP, atualizando a tabela de páginas do processo dono
+        address = page.frameAddress
+        log(DEBUG, 'Evicting page %s from frame %s...', page, address)
+        if self.writeBackDaemon is not None:
+            self.writeBackDaemon.pageEvicted(page)
+        if self.readahead is not None:
+            self.readahead.pageEvicted(page)
+        if self.compressedPool is not None and self.compressedPool.store(page):
+            pass  # a página fica comprimida na RAM, sem E/S na MS
         else:
-            # Atualiza os tempos de acesso para refletir a recente utilização da nova página
-            self.access_times[new_page.id] = max(
-                self.access_times.values(), default=0) + 1
+            if page.dirty:
+                log(DEBUG, 'Page is dirty, writing data to MS...')
+                self.faultPathWrites += 1
+            if self.secondaryMemory is not None:
+                self.secondaryMemory.pageOut(page)
+        self.markClean(page)
+        self.replacementPolicy.evict(page)
+        self.unmapPage(address)
+
+    def releaseFrame(self, address):
+        # Libera o quadro (usado quando o processo termina), retirando sua página da política
+        if self.reverseMap[address] is not None:
+            page = self.frames[address].page
+            self.replacementPolicy.remove(page)
+            self.markClean(page)
+            if self.readahead is not None:
+                self.readahead.pageReleased(page)
+            self.unmapPage(address)
+
+    def swapOutProcess(self, process):
+        # Retira da MP todas as páginas do processo de uma vez (só as que estão na MP, sem varrer a tabela)
+        for address in list(process.residentFrames):
+            self.evictPage(self.frames[address].page)
+
+    def loadPageFromSecondaryMemory(self, new_page, protected=None):
+        # Laço iterativo: enquanto não houver quadro livre, retira a vítima da política.
+        # Se a vítima escolhida for a página protegida, desiste e retorna None (sem carregar a página)
+        address = self.findFreeFrameAndAssignPage(new_page)
+        while address is None:
+            victim = self.findVictimPage(new_page)
+            if victim is None:
+                raise MemoryError('No frame can be freed for page ' + new_page.toString())
+            if victim is protected:
+                return None
+            self.evictPage(victim)
+            address = self.findFreeFrameAndAssignPage(new_page)
+        if self.compressedPool is not None and self.compressedPool.load(new_page):
+            pass  # atendida pelo pool comprimido, sem ler a MS
+        elif self.secondaryMemory is not None:
+            self.secondaryMemory.pageIn(new_page)  # traz o conteúdo da página do swap
+        return address
 
     def findFreeFrameAndAssignPage(self, new_page):
-        # Itera sobre os quadros na memória
-        for frame in self.frames:
-            # Verifica se o quadro não está ocupado
-            if not frame.isOccupied():
-                # Se encontrou um quadro livre, atribui a nova página a esse quadro
-                print('Found a free frame!')
-                frame.assignPage(new_page)
-                # Marca a nova página como presente na memória principal
-                new_page.inMainMemory = True
-                # Retorna o endereço de memória do quadro que foi atribuído à nova página
-                return frame.memoryAdress
+        # Pega um quadro livre no alocador (O(1))
+        address = self.allocator.popFreeFrame()
+        if address is not None:
+            # Se encontrou um quadro livre, atribui a nova página a esse quadro
+            log(DEBUG, 'Found a free frame!')
+            self.mapPage(new_page, address)
+            # Marca a nova página como a mais recentemente usada
+            self.replacementPolicy.insert(new_page, address)
+            # Retorna o endereço de memória do quadro que foi atribuído à nova página
+            return self.frames[address].memoryAdress
 
     def printMemory(self):  # dá um display de como está a memória no momento atual
-        print('\n Printing Memory:')
+        log(INFO, '\n Printing Memory:')
         i = 0
         for p in self.frames:
             i += 1
             if (p.isOccupied()):
-                print(" --Frame " + str(i) + " holds page " + p.page.toStringFull())
+                shared = ''
+                if p.page.mappings is not None:
+                    shared = '  (shared by ' + ', '.join(process.name for process, _ in p.page.mappings) + ')'
+                log(INFO, ' --Frame %s holds page %s%s', i, p.page.toStringFull(), shared)
             else:
-                print(" --Frame " + str(i)+" holds no page")
+                log(INFO, ' --Frame %s holds no page', i)
+
+    def printReplacementStats(self):
+        self.replacementPolicy.printStats()
 
     def printMemoryStatus(self):
-        usedFrames = 0
-        for p in self.frames:
-            if (p.isOccupied()):
-                usedFrames += 1
-        print('Out of ' + str(len(self.frames)) +
-              ' frames, '+str(usedFrames) + ' are used.')
+        usedFrames = self.allocator.usedFrames
+        log(INFO, 'Out of %s frames, %s are used.', len(self.frames), usedFrames)
+
+    def sharingStats(self):
+        # Quadros com páginas compartilhadas/privadas e quantos quadros o compartilhamento economiza
+        shared = 0
+        saved = 0
+        for frame in self.frames:
+            if frame.page is not None and frame.page.mappings is not None:
+                shared += 1
+                saved += len(frame.page.mappings) - 1
+        return {'sharedFrames': shared, 'privateFrames': self.allocator.usedFrames - shared,
+                'framesSaved': saved, 'pagesSharedByFork': self.pagesSharedByFork,
+                'cowCopies': self.cowCopies, 'segments': len(self.sharedSegments)}
+
+    def printSharingStats(self):
+        stats = self.sharingStats()
+        log(INFO, 'Sharing: %s shared frames, %s private frames, %s frames saved; fork shared %s pages, %s '
+                  'copied on write; %s shared segments.',
+            stats['sharedFrames'], stats['privateFrames'], stats['framesSaved'], stats['pagesSharedByFork'],
+            stats['cowCopies'], stats['segments'])
+
+
+class TLB:
+    # TLB associativa por conjuntos na frente da tabela de páginas.
+    # Cada conjunto é um OrderedDict (processo, id da página) -> página, com substituição LRU ou aleatória.
+    # É esvaziada na troca de contexto e a entrada da página é invalidada quando ela sai da MP
+    def __init__(self, _size, _associativity=None, _replacement='LRU', _seed=DEFAULT_SEED,
+                 _hitTime=1, _memoryAccessTime=100, _pageWalkAccesses=1):
+        if _associativity is None:
+            _associativity = _size  # totalmente associativa
+        if _size <= 0 or _associativity <= 0 or _size % _associativity != 0:
+            raise ValueError('TLB size must be a positive multiple of its associativity')
+        if _replacement.upper() not in ('LRU', 'RANDOM'):
+            raise ValueError('Unknown TLB replacement: ' + str(_replacement) + ' (available: LRU, RANDOM)')
+        self.size = _size
+        self.associativity = _associativity
+        self.numberOfSets = _size // _associativity
+        self.replacement = _replacement.upper()
+        self.random = random.Random(_seed)
+        self.sets = [OrderedDict() for _ in range(self.numberOfSets)]
+        # tempos (em u.t arbitrárias) para o cálculo do tempo efetivo de acesso
+        self.hitTime = _hitTime
+        self.memoryAccessTime = _memoryAccessTime
+        self.pageWalkAccesses = _pageWalkAccesses  # acessos à memória para percorrer a tabela de páginas
+        # estatísticas
+        self.hits = 0
+        self.misses = 0
+        self.flushes = 0
+        self.invalidations = 0
+
+    def setFor(self, pageId):
+        return self.sets[pageId % self.numberOfSets]
+
+    def lookup(self, process, pageId):
+        # Retorna a página se a tradução está na TLB (hit), ou None (miss)
+        entries = self.setFor(pageId)
+        key = (process, pageId)
+        page = entries.get(key)
+        if page is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if self.replacement == 'LRU':
+            entries.move_to_end(key)
+        return page
+
+    def insert(self, process, pageId, page):
+        entries = self.setFor(pageId)
+        key = (process, pageId)
+        if key not in entries and len(entries) >= self.associativity:
+            if self.replacement == 'LRU':
+                entries.popitem(last=False)
+            else:
+                del entries[self.random.choice(list(entries))]
+        entries[key] = page
+
+    def invalidate(self, process, pageId):
+        if self.setFor(pageId).pop((process, pageId), None) is not None:
+            self.invalidations += 1
+
+    def flush(self):
+        for entries in self.sets:
+            entries.clear()
+        self.flushes += 1
+
+    def hitRatio(self):
+        accesses = self.hits + self.misses
+        if accesses == 0:
+            return 0.0
+        return self.hits / accesses
+
+    def effectiveAccessTime(self):
+        # EAT = h*(t + m) + (1 - h)*(t + (acessos da tabela de páginas + 1)*m)
+        h = self.hitRatio()
+        t = self.hitTime
+        m = self.memoryAccessTime
+        return h*(t + m) + (1 - h)*(t + (self.pageWalkAccesses + 1)*m)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'hitRatio': self.hitRatio(),
+                'effectiveAccessTime': self.effectiveAccessTime(), 'flushes': self.flushes,
+                'invalidations': self.invalidations}
+
+    def printStats(self):
+        log(INFO, 'TLB (%s entries, %s-way, %s): %s hits, %s misses, hit ratio %.2f%%, effective access '
+                  'time %.1f u.t.',
+            self.size, self.associativity, self.replacement, self.hits, self.misses, self.hitRatio()*100,
+            self.effectiveAccessTime())
+
+
+class ReadaheadEngine:
+    # Leitura antecipada: detecta, por processo, acessos sequenciais às páginas virtuais e,
+    # numa falta de página no meio de uma sequência, já traz as próximas 'janela' páginas.
+    # A janela cresce (+1) cada vez que uma página antecipada é usada e cai pela metade
+    # quando uma página antecipada sai da MP sem ter sido usada
+    def __init__(self, _memory, _initialWindow=2, _maxWindow=32):
+        self.memory = _memory
+        self.initialWindow = _initialWindow
+        # não deixa a janela ocupar mais que metade da MP (senão a antecipação expulsa a si mesma)
+        self.maxWindow = max(1, min(_maxWindow, _memory.pageQuantity // 2))
+        self.streams = {}  # processo -> [última página acessada, passos sequenciais, janela]
+        self.prefetched = set()  # páginas antecipadas ainda não usadas
+        # estatísticas
+        self.pagesPrefetched = 0
+        self.prefetchHits = 0  # faltas de página evitadas
+        self.prefetchWasted = 0
+
+    def observe(self, process, pageId):
+        # Chamado em todo acesso R/W/P, com a página virtual acessada
+        stream = self.streams.get(process)
+        if stream is None:
+            self.streams[process] = [pageId, 0, self.initialWindow]
+            return
+        if pageId == stream[0] + 1:
+            stream[1] += 1
+        elif pageId != stream[0]:
+            stream[1] = 0
+        stream[0] = pageId
+
+    def pageFaulted(self, page):
+        stream = self.streams.get(page.process)
+        if stream is None or stream[1] == 0:  # acesso não sequencial: nada a antecipar
+            return
+        process = page.process
+        for pageId in range(page.id + 1, page.id + 1 + stream[2]):
+            target = process.pageTable.entry(pageId)
+            if target is None:
+                target = process.materializePage(pageId)
+                if target is None:  # passou do fim do processo
+                    break
+            if target.inMainMemory:
+                continue
+            if not self.memory.prefetchPage(target, page):
+                break
+            self.prefetched.add(target)
+            self.pagesPrefetched += 1
+
+    def pageHit(self, page):
+        if page in self.prefetched:
+            self.prefetched.discard(page)
+            self.prefetchHits += 1
+            stream = self.streams.get(page.process)
+            if stream is not None:
+                stream[2] = min(self.maxWindow, stream[2] + 1)
+
+    def pageEvicted(self, page):
+        if page in self.prefetched:
+            self.prefetched.discard(page)
+            self.prefetchWasted += 1
+            stream = self.streams.get(page.process)
+            if stream is not None:
+                stream[2] = max(1, stream[2] // 2)
+
+    def pageReleased(self, page):
+        self.prefetched.discard(page)
+
+    def processEnded(self, process):
+        self.streams.pop(process, None)
+
+    def accuracy(self):
+        if self.pagesPrefetched == 0:
+            return 0.0
+        return self.prefetchHits / self.pagesPrefetched
+
+    def stats(self):
+        return {'pagesPrefetched': self.pagesPrefetched, 'prefetchHits': self.prefetchHits,
+                'prefetchWasted': self.prefetchWasted, 'accuracy': self.accuracy(),
+                'faultsSaved': self.prefetchHits}
+
+    def printStats(self):
+        log(INFO, 'Readahead: %s pages prefetched, accuracy %.2f%%, %s page faults saved.',
+            self.pagesPrefetched, self.accuracy()*100, self.prefetchHits)
+
+
+class LoadController:
+    # Controle de carga contra thrashing.
+    # Conjunto de trabalho: para cada processo, as páginas distintas entre as suas últimas
+    # 'window' referências (janela deslizante, O(1) por referência).
+    # PFF: faltas de página por u.t nas últimas 'pffInterval' u.t.
+    # Se os conjuntos de trabalho não cabem nos quadros da MP e a taxa de faltas passa de 'pffHigh',
+    # o processo ativo com o maior conjunto de trabalho é suspenso (estado 'suspended') e todas as
+    # suas páginas saem da MP de uma vez. Ele é readmitido quando o conjunto de trabalho dele volta
+    # a caber em 'readmitFraction' dos quadros (ou quando não há mais nada para rodar).
+    # A demanda total (soma dos conjuntos de trabalho dos processos não suspensos) é mantida a cada
+    # referência, então cada u.t custa O(1); o histórico guarda só as últimas 'historyLength' amostras
+    def __init__(self, _configuration, _window=32, _pffInterval=20, _pffHigh=0.5,
+                 _readmitFraction=0.8, _sampleInterval=10, _historyLength=100):
+        self.configuration = _configuration
+        self.window = _window
+        self.pffInterval = _pffInterval
+        self.pffHigh = _pffHigh
+        self.readmitFraction = _readmitFraction
+        self.sampleInterval = _sampleInterval
+        self.references = {}  # processo -> deque das últimas páginas referenciadas
+        self.pageCounts = {}  # processo -> {página: vezes que aparece na janela}
+        self.faultTimes = deque()  # u.t das faltas de página recentes
+        self.suspended = deque()  # processos suspensos pelo controle de carga, em ordem
+        self.suspendedWorkingSet = {}  # processo suspenso -> conjunto de trabalho ao ser suspenso
+        self.demand = 0  # soma dos conjuntos de trabalho dos processos não suspensos
+        self.time = 0
+        self.history = deque(maxlen=_historyLength)  # (u.t, {processo: tamanho do conjunto de trabalho})
+        # estatísticas
+        self.suspensions = 0
+        self.readmissions = 0
+        self.thrashingTicks = 0
+
+    def observe(self, process, pageId):
+        # Chamado em todo acesso R/W/P
+        refs = self.references.get(process)
+        if refs is None:
+            refs = self.references[process] = deque()
+            self.pageCounts[process] = {}
+        counts = self.pageCounts[process]
+        size = len(counts)
+        refs.append(pageId)
+        counts[pageId] = counts.get(pageId, 0) + 1
+        if len(refs) > self.window:
+            old = refs.popleft()
+            counts[old] -= 1
+            if counts[old] == 0:
+                del counts[old]
+        if process not in self.suspendedWorkingSet:  # suspensos não entram na demanda
+            self.demand += len(counts) - size
+
+    def pageFaulted(self, page):
+        self.faultTimes.append(self.time)
+
+    def workingSetSize(self, process):
+        counts = self.pageCounts.get(process)
+        if counts is None:
+            return 0
+        return len(counts)
+
+    def faultRate(self):
+        while self.faultTimes and self.faultTimes[0] <= self.time - self.pffInterval:
+            self.faultTimes.popleft()
+        return len(self.faultTimes) / self.pffInterval
+
+    def activeProcesses(self):
+        return [p for p in self.configuration.simulator.images.values() if p.state != 'suspended']
+
+    def tick(self, time):
+        self.time = time
+        demand = self.demand
+        frames = self.configuration.MP.pageQuantity
+        if self.sampleInterval and time % self.sampleInterval == 0:
+            # só os processos vivos (os que já terminaram teriam conjunto de trabalho vazio)
+            self.history.append((time, {p.name: len(counts) for p, counts in self.pageCounts.items()}))
+        if demand > frames and self.faultRate() > self.pffHigh:
+            self.thrashingTicks += 1
+            self.suspendOne(demand, frames)
+        elif self.suspended:
+            self.readmitIfRoom(demand, frames)
+
+    def suspendOne(self, demand, frames):
+        # processos em execução (em qualquer núcleo) e bloqueados não são suspensos
+        candidates = [p for p in self.activeProcesses() if p.state not in ('executing', 'blocked')]
+        if not candidates:  # suspender só os processos que rodam não resolve nada
+            return
+        victim = max(candidates, key=self.workingSetSize)
+        log(INFO, 'Load control: thrashing detected (working sets need %s frames, %s available), suspending '
+                  '%s.',
+            demand, frames, victim.name)
+        self.suspendedWorkingSet[victim] = self.workingSetSize(victim)
+        self.demand -= self.suspendedWorkingSet[victim]
+        self.suspended.append(victim)
+        self.suspensions += 1
+        self.configuration.simulator.suspendProcess(victim)
+
+    def readmitIfRoom(self, demand, frames):
+        while self.suspended and self.suspended[0].state != 'suspended':  # já voltou por outro caminho
+            self.resumed(self.suspended.popleft())
+            demand = self.demand
+        if self.suspended:
+            process = self.suspended[0]
+            if demand + self.suspendedWorkingSet[process] <= frames*self.readmitFraction:
+                self.readmit()
+
+    def readmit(self):
+        process = self.suspended.popleft()
+        self.resumed(process)
+        log(INFO, 'Load control: memory pressure dropped, readmitting %s.', process.name)
+        self.configuration.simulator.wakeProcess(process)
+        self.readmissions += 1
+
+    def resumed(self, process):
+        # O processo deixou de estar suspenso: o conjunto de trabalho dele volta a contar na demanda
+        del self.suspendedWorkingSet[process]
+        self.demand += self.workingSetSize(process)
+
+    def idle(self):
+        # Nada pronto para rodar: readmite um processo suspenso para não travar a simulação
+        if self.suspended:
+            self.readmit()
+
+    def processEnded(self, process):
+        if process in self.suspendedWorkingSet:
+            self.suspended.remove(process)
+            del self.suspendedWorkingSet[process]
+        else:
+            self.demand -= self.workingSetSize(process)
+        self.references.pop(process, None)
+        self.pageCounts.pop(process, None)
+
+    def stats(self):
+        return {'suspensions': self.suspensions, 'readmissions': self.readmissions,
+                'thrashingTicks': self.thrashingTicks,
+                'workingSets': {p.name: self.workingSetSize(p)
+                                for p in self.configuration.simulator.images.values()}}
+
+    def printStats(self):
+        log(INFO, 'Load control: %s suspensions, %s readmissions, %s thrashing u.t.',
+            self.suspensions, self.readmissions, self.thrashingTicks)
+        for time, sizes in self.history:
+            log(INFO, ' t=%s working sets: %s',
+                time, ', '.join(name + '=' + str(size) for name, size in sizes.items()))
+
+
+class WriteBackDaemon:
+    # 'pdflush' do simulador: roda a cada u.t do simulador, e quando a quantidade de páginas sujas
+    # na MP passa da marca alta (ou a cada 'interval' u.t), escreve as páginas sujas mais antigas
+    # no swap até sobrar só a marca baixa. As escritas são ordenadas por slot e agrupadas em lotes
+    # de slots consecutivos, tirando a escrita do caminho da falta de página
+    def __init__(self, _memory, _highWatermark, _lowWatermark, _interval=0, _batchSize=32):
+        self.memory = _memory
+        self.highWatermark = _highWatermark
+        self.lowWatermark = _lowWatermark
+        self.interval = _interval  # 0 desliga o flush periódico
+        self.batchSize = _batchSize
+        self.cleaned = set()  # páginas limpas pelo daemon e ainda não sujas de novo
+        # estatísticas
+        self.pagesFlushed = 0
+        self.writeBatches = 0
+        self.stallsAvoided = 0  # páginas retiradas da MP que não precisaram ser escritas na falta
+
+    def tick(self, time):
+        dirtyCount = len(self.memory.dirtyPages)
+        if dirtyCount == 0:
+            return
+        if dirtyCount >= self.highWatermark or (self.interval and time % self.interval == 0):
+            self.flush(self.lowWatermark)
+
+    def flush(self, target=0):
+        # Escreve as páginas sujas mais antigas até sobrar 'target' páginas sujas
+        amount = len(self.memory.dirtyPages) - target
+        if amount <= 0:
+            return
+        MS = self.memory.secondaryMemory
+        pages = []
+        for page in self.memory.dirtyPages:
+            pages.append(page)
+            if len(pages) == amount:
+                break
+        for page in pages:
+            MS.allocatePage(page)
+        pages.sort(key=lambda page: page.swapSlot)  # escrita sequencial no swap
+        batches = 0
+        batch = []
+        for page in pages:
+            if batch and (page.swapSlot != batch[-1].swapSlot + 1 or len(batch) == self.batchSize):
+                MS.writeBatch(batch)
+                batches += 1
+                batch = []
+            batch.append(page)
+        if batch:
+            MS.writeBatch(batch)
+            batches += 1
+        for page in pages:
+            self.memory.markClean(page)
+            self.cleaned.add(page)
+        self.pagesFlushed += len(pages)
+        self.writeBatches += batches
+        log(INFO, 'Write-back daemon flushed %s dirty pages in %s batches.', len(pages), batches)
+
+    def pageDirtied(self, page):
+        self.cleaned.discard(page)
+
+    def pageEvicted(self, page):
+        if page in self.cleaned:
+            self.cleaned.discard(page)
+            self.stallsAvoided += 1
+
+    def stats(self):
+        return {'pagesFlushed': self.pagesFlushed, 'writeBatches': self.writeBatches,
+                'stallsAvoided': self.stallsAvoided}
+
+    def printStats(self):
+        log(INFO, 'Write-back daemon: %s pages flushed in %s batches, %s fault-path write stalls avoided.',
+            self.pagesFlushed, self.writeBatches, self.stallsAvoided)
+
+
+def lzmaCompress(data, level):
+    import lzma  # import adiado: só quem usa o pool com lzma paga por ele na inicialização
+    return lzma.compress(data, preset=level)
+
+
+def lzmaDecompress(blob):
+    import lzma
+    return lzma.decompress(blob)
+
+
+class CompressedSwapPool:
+    # Camada de swap comprimido (tipo zswap) entre a MP e a MS: as páginas que saem da MP são
+    # comprimidas (zlib ou lzma) e guardadas num pool em RAM com orçamento em bytes. Uma falta é
+    # atendida pelo pool (descompressão) antes de ir à MS; quando o pool estoura o orçamento, as
+    # entradas mais antigas (LRU) são despejadas na MS. Páginas que não comprimem vão direto para a MS
+    COMPRESSORS = {
+        'zlib': (lambda data, level: zlib.compress(data, level), zlib.decompress),
+        'lzma': (lzmaCompress, lzmaDecompress),
+    }
+
+    def __init__(self, _memory, _budgetBytes, _algorithm='zlib', _level=1,
+                 _poolLoadTime=5, _secondaryLoadTime=1000):
+        if _algorithm.lower() not in self.COMPRESSORS:
+            raise ValueError('Unknown compression algorithm: ' + str(_algorithm) +
+                             ' (available: ' + ', '.join(self.COMPRESSORS) + ')')
+        self.memory = _memory
+        self.budgetBytes = _budgetBytes
+        self.algorithm = _algorithm.lower()
+        self.compress, self.decompress = self.COMPRESSORS[self.algorithm]
+        self.level = _level
+        # tempos (em u.t arbitrárias) de uma falta atendida pelo pool e de uma lida da MS
+        self.poolLoadTime = _poolLoadTime
+        self.secondaryLoadTime = _secondaryLoadTime
+        self.entries = OrderedDict()  # página -> (conteúdo comprimido, suja?), da mais antiga para a mais nova
+        self.usedBytes = 0
+        # estatísticas
+        self.pagesStored = 0
+        self.pagesRejected = 0  # não comprimiram, foram direto para a MS
+        self.originalBytes = 0
+        self.compressedBytes = 0
+        self.hits = 0
+        self.misses = 0  # faltas que tiveram que ler a MS
+        self.pagesSpilled = 0
+        self.spillWrites = 0  # páginas despejadas que precisaram ser escritas na MS
+
+    def store(self, page):
+        # Chamado quando a página sai da MP. Retorna False se a página deve ir para a MS
+        if not page.dirty and not page.swapValid:
+            return False  # nunca escrita: volta vazia, não precisa ser guardada em lugar nenhum
+        raw = memoryview(page.data).cast('B')
+        blob = self.compress(raw, self.level)
+        if len(blob) >= len(raw) or len(blob) > self.budgetBytes:
+            self.pagesRejected += 1
+            return False
+        log(DEBUG, 'Compressing page %s into the compressed pool (%s -> %s bytes)...',
+            page, len(raw), len(blob))
+        self.entries[page] = (blob, page.dirty)
+        self.usedBytes += len(blob)
+        self.pagesStored += 1
+        self.originalBytes += len(raw)
+        self.compressedBytes += len(blob)
+        page.data = None
+        while self.usedBytes > self.budgetBytes:
+            self.spill()
+        return True
+
+    def load(self, page):
+        # Chamado na volta da página para a MP. Retorna False se ela não está no pool
+        entry = self.entries.pop(page, None)
+        if entry is None:
+            if page.swapValid:
+                self.misses += 1
+            return False
+        blob, dirty = entry
+        self.usedBytes -= len(blob)
+        self.hits += 1
+        page.data = array('q')
+        page.data.frombytes(self.decompress(blob))
+        if dirty:  # o conteúdo só existia no pool: a página volta suja para a MP
+            self.memory.markDirty(page)
+        return True
+
+    def spill(self):
+        # Despeja a entrada mais antiga do pool na MS
+        page, (blob, dirty) = self.entries.popitem(last=False)
+        self.usedBytes -= len(blob)
+        self.pagesSpilled += 1
+        if dirty:
+            log(DEBUG, 'Compressed pool is full, writing page %s to MS...', page)
+            page.data = array('q')
+            page.data.frombytes(self.decompress(blob))
+            self.memory.secondaryMemory.writePage(page)
+            page.data = None
+            self.spillWrites += 1
+
+    def discard(self, page):
+        entry = self.entries.pop(page, None)
+        if entry is not None:
+            self.usedBytes -= len(entry[0])
+
+    def processEnded(self, process):
+        for page in [page for page in self.entries if page.process is process]:
+            self.discard(page)
+
+    def compressionRatio(self):
+        if self.compressedBytes == 0:
+            return 0
+        return self.originalBytes / self.compressedBytes
+
+    def hitRate(self):
+        total = self.hits + self.misses
+        if total == 0:
+            return 0
+        return self.hits / total
+
+    def latencySaved(self):
+        # Tempo economizado em relação a atender as mesmas faltas lendo a MS
+        return self.hits*(self.secondaryLoadTime - self.poolLoadTime)
+
+    def stats(self):
+        return {'algorithm': self.algorithm, 'pagesStored': self.pagesStored,
+                'pagesRejected': self.pagesRejected, 'compressionRatio': self.compressionRatio(),
+                'hits': self.hits, 'misses': self.misses, 'hitRate': self.hitRate(),
+                'pagesSpilled': self.pagesSpilled, 'spillWrites': self.spillWrites,
+                'usedBytes': self.usedBytes, 'budgetBytes': self.budgetBytes,
+                'latencySaved': self.latencySaved()}
+
+    def printStats(self):
+        log(INFO, 'Compressed pool (%s): %s pages stored, %s rejected, ratio %.2f, hit rate %.2f%%, %s '
+                  'spilled to MS, %s/%s bytes used, %s u.t saved.',
+            self.algorithm, self.pagesStored, self.pagesRejected, self.compressionRatio(),
+            self.hitRate()*100, self.pagesSpilled, self.usedBytes, self.budgetBytes, self.latencySaved())
 
 
 class SecondaryMemory:
-    def __init__(self, _size, _pageQuanitity, _pageSizeInInts):
+    # A MS é um arquivo de swap mapeado em memória (mmap), dividido em slots do tamanho de uma página.
+    # Páginas sujas são escritas no seu slot quando saem da MP, e lidas de volta quando voltam,
+    # sempre através de fatias de memoryview (sem cópias intermediárias)
+    def __init__(self, _size, _pageQuanitity, _pageSizeInInts, _swapFilePath=None, _requireReservation=False):
         self.size = _size
-        self.frames = []
-        for i in range(_pageQuanitity):
-            self.frames.append(Frame(_pageSizeInInts, i))
-        print('Creating secondary memory...')
-        print('Size: '+str(len(self.frames)) + ' frames.')
+        log(INFO, 'Creating secondary memory...')
+        log(INFO, 'Size: %s frames.', _pageQuanitity)
         self.pageQuantity = _pageQuanitity
         self.pageSizeInInts = _pageSizeInInts
-        pageQuantity = self.size/self.pageSizeInInts
+        self.slotSize = _pageSizeInInts*EMPTY_PAGE_ITEMSIZE  # bytes por slot
+        self.allocator = FrameAllocator(_pageQuanitity)  # slots livres do swap
+        # Paginação por demanda: processos e segmentos reservam na criação um slot por página, e
+        # nenhum slot é entregue fora dessas reservas (então uma página nunca fica sem lugar no swap)
+        self.reservedSlots = 0
+        self.requireReservation = _requireReservation
+        # arquivo de swap: temporário (apagado ao fechar) se nenhum caminho for dado
+        if _swapFilePath is None:
+            import tempfile  # só aqui: é o import mais caro do módulo
+            self.swapFile = tempfile.TemporaryFile()
+        else:
+            self.swapFile = open(_swapFilePath, 'w+b')
+        self.swapFile.truncate(self.slotSize*_pageQuanitity)
+        self.swap = None
+        self.view = None
+        if _pageQuanitity > 0:
+            self.swap = mmap.mmap(self.swapFile.fileno(), self.slotSize*_pageQuanitity)
+            self.view = memoryview(self.swap)
+        # estatísticas de E/S
+        self.writeOps = 0  # operações de escrita (um lote conta como uma)
+        self.pagesWritten = 0
+        self.pagesRead = 0
+        self.bytesWritten = 0
+        self.bytesRead = 0
 
     def allocatePage(self, p):
-        # versão que não funciona perfeitamente:
-        for f in self.frames:
-            if not (f.isOccupied()):
-                # Nesse caso como é memoria secundaria nn deve mudar bit de presença na MP nem lugar na TP eu acho
-                f.assignPage(p)
-        # talvez tenha que ter um check pra garantir que um processo não é maior que a MS? algm ve isso dps
+        # Reserva um slot do swap para a página (se ela ainda não tem um)
+        # Nesse caso como é memoria secundaria nn deve mudar bit de presença na MP nem lugar na TP
+        if p.swapSlot is None:
+            # checado antes de tirar o slot da lista de livres (senão ele se perderia)
+            if self.requireReservation and self.allocator.usedFrames >= self.reservedSlots:
+                raise MemoryError('No reserved swap slot left for page ' + p.toString())
+            slot = self.allocator.popFreeFrame()
+            if slot is None:
+                raise MemoryError('Secondary memory is full, cannot swap out page ' + p.toString())
+            self.allocator.markUsed(slot)
+            p.swapSlot = slot
+            p.process.swappedPages.add(p)
+        return p.swapSlot
+
+    def reserveSlots(self, amount):
+        # Reserva espaço no swap para 'amount' páginas (paginação por demanda), sem escolher os slots ainda.
+        # Retorna False (sem reservar nada) se o swap não comporta mais essas páginas
+        if self.reservedSlots + amount > self.pageQuantity:
+            return False
+        self.reservedSlots += amount
+        return True
+
+    def releaseReservation(self, amount):
+        self.reservedSlots -= amount
+
+    def freePage(self, p):
+        # Libera o slot da página (quando o processo termina)
+        if p.swapSlot is not None:
+            self.allocator.markFree(p.swapSlot)
+            p.process.swappedPages.discard(p)
+            p.swapSlot = None
+            p.swapValid = False
+
+    def writeBatch(self, pages):
+        # Escreve de uma vez páginas com slots consecutivos (uma única operação de E/S sequencial)
+        start = pages[0].swapSlot*self.slotSize
+        run = self.view[start:start + len(pages)*self.slotSize]
+        for i, p in enumerate(pages):
+            run[i*self.slotSize:(i + 1)*self.slotSize] = memoryview(p.data).cast('B')
+            p.swapValid = True
+        self.writeOps += 1
+        self.pagesWritten += len(pages)
+        self.bytesWritten += len(pages)*self.slotSize
+
+    def slotView(self, slot):
+        start = slot*self.slotSize
+        return self.view[start:start + self.slotSize]
+
+    def writePage(self, p):
+        # Escreve o conteúdo da página no seu slot do swap
+        slot = self.allocatePage(p)
+        self.slotView(slot)[:] = memoryview(p.data).cast('B')
+        p.swapValid = True
+        self.writeOps += 1
+        self.pagesWritten += 1
+        self.bytesWritten += self.slotSize
+
+    def readPage(self, p):
+        # Lê o conteúdo da página do seu slot do swap direto para o array da página
+        self.pagesRead += 1
+        self.bytesRead += self.slotSize
+        memoryview(p.data).cast('B')[:] = self.slotView(p.swapSlot)
+
+    def pageOut(self, p):
+        # Página saindo da MP: se está suja, escreve no swap. O conteúdo deixa de ocupar RAM
+        if p.dirty:
+            self.writePage(p)
+            p.dirty = False
+        p.data = None
+
+    def pageIn(self, p):
+        # Página voltando para a MP: recria o array e lê do swap (ou fica vazia se nunca foi escrita)
+        if p.data is not None:
+            return
+        p.data = emptyPageData(p.size)[:]
+        if p.swapValid:
+            self.readPage(p)
+
+    def printStats(self):
+        log(INFO, 'Secondary memory I/O: %s pages written (%s bytes, %s writes), %s pages read (%s bytes), '
+                  '%s slots in use.',
+            self.pagesWritten, self.bytesWritten, self.writeOps, self.pagesRead, self.bytesRead,
+            self.allocator.usedFrames)
+
+    def close(self):
+        if self.view is not None:
+            self.view.release()
+            self.swap.close()
+        self.swapFile.close()
+
+# Tipos de evento do núcleo de eventos discretos do simulador
+IO_COMPLETION = 'io'  # um dispositivo terminou a E/S
+TIMER = 'timer'  # interrupção de relógio (roda as tarefas de fundo do kernel)
+ARRIVAL = 'arrival'  # um processo chega ao escalonador
+QUANTUM_EXPIRY = 'quantum'  # o processo em execução esgotou o seu quantum
+
+
+class EventQueue:
+    # Fila de prioridade (heap) de eventos com horário marcado: (tempo, ordem, tipo, dado).
+    # A ordem de inserção desempata eventos do mesmo instante
+    def __init__(self):
+        self.heap = []
+        self.sequence = 0
+
+    def push(self, time, kind, payload=None):
+        heapq.heappush(self.heap, (time, self.sequence, kind, payload))
+        self.sequence += 1
+
+    def nextTime(self):
+        # Horário do próximo evento, ou None se a fila está vazia
+        if not self.heap:
+            return None
+        return self.heap[0][0]
+
+    def popDue(self, time):
+        # Retira, em ordem, os eventos marcados até 'time'
+        while self.heap and self.heap[0][0] <= time:
+            event = heapq.heappop(self.heap)
+            yield event[2], event[3]
+
+    def __len__(self):
+        return len(self.heap)
+
+
+class LatencyModel:
+    # Distribuição do tempo de serviço de um dispositivo, em u.t inteiras (no mínimo 1).
+    # Cada modelo tem o seu próprio gerador, com semente, para as simulações serem reproduzíveis.
+    # Sem semente explícita, o dispositivo que usa o modelo dá uma própria (ver Configuration.deviceSeed),
+    # então dois dispositivos com a mesma distribuição não sorteiam os mesmos tempos
+    name = 'BASE'
+
+    def __init__(self, seed=None):
+        self.seed = seed
+        self.random = random.Random(DEFAULT_SEED if seed is None else seed)
+
+    def reseed(self, seed):
+        self.seed = seed
+        self.random.seed(seed)
+
+    def sample(self):
+        raise NotImplementedError
+
+    def mean(self):
+        raise NotImplementedError
+
+
+class ConstantLatency(LatencyModel):
+    name = 'constant'
+
+    def __init__(self, value, seed=None):
+        super().__init__(seed)
+        self.value = value
+
+    def sample(self):
+        return self.value
+
+    def mean(self):
+        return self.value
+
+
+class ExponentialLatency(LatencyModel):
+    name = 'exponential'
+
+    def __init__(self, mean, seed=None):
+        super().__init__(seed)
+        self.average = mean
+
+    def sample(self):
+        return max(1, round(self.random.expovariate(1/self.average)))
+
+    def mean(self):
+        return self.average
+
+
+class EmpiricalLatency(LatencyModel):
+    # Sorteia entre tempos medidos (ex: lidos de um arquivo com um tempo por linha)
+    name = 'empirical'
+
+    def __init__(self, samples, seed=None):
+        super().__init__(seed)
+        if not samples:
+            raise ValueError('Empirical latency model needs at least one sample')
+        self.samples = [max(1, round(sample)) for sample in samples]
+
+    @classmethod
+    def fromFile(cls, path, seed=None):
+        # Um tempo (em u.t) por linha; linhas vazias e comentários ('#') são ignorados
+        samples = []
+        with open(path, 'r') as file:
+            for line in file:
+                line = line.split('#', 1)[0].strip()
+                if line:
+                    samples.append(float(line))
+        return cls(samples, seed)
+
+    def sample(self):
+        return self.random.choice(self.samples)
+
+    def mean(self):
+        return sum(self.samples) / len(self.samples)
+
+
+LATENCY_MODELS = {
+    'constant': ConstantLatency,
+    'exponential': ExponentialLatency,
+    'empirical': EmpiricalLatency,
+}
+
+
+def makeLatencyModel(name, parameter, seed=None):
+    # Cria o modelo de latência a partir do nome: 'constant' e 'exponential' recebem o tempo
+    # (médio), 'empirical' recebe a lista de tempos ou o caminho do arquivo com eles
+    try:
+        modelClass = LATENCY_MODELS[name.lower()]
+    except KeyError:
+        raise ValueError('Unknown latency model: ' + str(name) +
+                         ' (available: ' + ', '.join(LATENCY_MODELS) + ')')
+    if modelClass is EmpiricalLatency and isinstance(parameter, str):
+        return EmpiricalLatency.fromFile(parameter, seed)
+    return modelClass(parameter, seed)
+
+
+class DMAChannel:
+    # Canal de DMA: move blocos do tamanho de uma página entre os dispositivos e a MP sem ocupar
+    # a CPU. A banda (ints por u.t) é dividida pelos dispositivos ligados ao canal: uma transferência
+    # por vez. Cada transferência ocupa o primeiro intervalo livre do canal a partir do instante em
+    # que os dados dela estão prontos (um dispositivo lento não segura o canal antes da hora)
+    def __init__(self, _name, _bandwidth, _blockSize):
+        self.name = _name
+        self.bandwidth = _bandwidth
+        self.blockSize = _blockSize
+        self.reservations = []  # (início, fim) das transferências agendadas, em ordem
+        self.transfers = 0
+        self.blocks = 0
+        self.busyTime = 0
+        self.queueDelay = 0  # u.t que as transferências esperaram o canal ficar livre
+
+    def reserve(self, ready, blocks, now=0):
+        # Agenda a transferência de 'blocks' blocos a partir de 'ready'; retorna quando ela termina.
+        # Reservas que terminaram até 'now' não atrapalham mais ninguém e são descartadas
+        reservations = self.reservations
+        done = 0
+        while done < len(reservations) and reservations[done][1] <= now:
+            done += 1
+        del reservations[:done]
+        duration = max(1, math.ceil(blocks*self.blockSize/self.bandwidth))
+        i = bisect.bisect_right(reservations, (ready, math.inf))
+        start = ready
+        if i > 0:
+            start = max(start, reservations[i - 1][1])
+        while i < len(reservations) and reservations[i][0] < start + duration:  # não cabe antes desta
+            start = max(start, reservations[i][1])
+            i += 1
+        reservations.insert(i, (start, start + duration))
+        self.queueDelay += start - ready
+        self.transfers += 1
+        self.blocks += blocks
+        self.busyTime += duration
+        return start + duration
+
+    def stats(self, elapsed):
+        return {'transfers': self.transfers, 'blocks': self.blocks, 'busyTime': self.busyTime,
+                'utilization': min(1.0, self.busyTime / elapsed) if elapsed else 0.0,
+                'averageQueueDelay': self.queueDelay / self.transfers if self.transfers else 0.0}
+
 
 class ioDevice():
-    def __init__(self,_id, _ioTime):
+    def __init__(self,_id, _latency, _channel=None, _blocks=1):
         self.id = _id
-        self.completed = False
-        self.ioTime = _ioTime
-        print('Connecting device ' + str(self.id) +'...')
-
-    def passTime(self):
-        self.timeSinceLastIO +=1
-        if(self.timeSinceLastIO > self.ioTime): #if has finished
-            self.completed = True
-            self.timeSinceLastIO = 0
-            print('\nIO operation finished, so ' + self.tiedProcess.name + ' is now ready again!')
-            self.tiedProcess.state = 'ready'
-            for inst in self.tiedProcess.configuration.simulator.instructionBacklog:
-                if(inst.process_name == self.tiedProcess.name): #Libera instruções do processo bloqueado (e manda p/ fila d prioridade)
-                    self.tiedProcess.configuration.simulator.priorityInstructions.append(inst)
-            
-                if(inst.action == 'I'):
-                    if(int(inst.args[0]) == self.id):
-                        self.tiedProcess.configuration.simulator.priorityInstructions.append(inst)
-                        self.tiedProcess.configuration.simulator.getProcess(inst.process_name).state = 'ready'
-
-    def beginDeviceUse(self, process):
-        print('Beggining use of device ' + str(self.id))
+        self.completed = True
+        self.latency = _latency  # modelo do tempo de serviço (ver LATENCY_MODELS)
+        self.channel = _channel  # canal de DMA (None: a CPU copia os dados, E/S programada)
+        self.blocks = _blocks  # blocos do tamanho de uma página movidos por requisição
+        self.tiedProcess = None
+        # fila (FIFO) de (processo, instrução, instante em que entrou na fila, núcleo que pediu a E/S)
+        # esperando o dispositivo
+        self.waiters = deque()
+        # estatísticas: usos, espera na fila e profundidade da fila ao longo do tempo
+        self.uses = 0
+        self.busyTime = 0
+        self.busySince = 0
+        self.waits = 0
+        self.totalWait = 0
+        self.maxWait = 0
+        self.maxQueueDepth = 0
+        self.queueArea = 0  # soma de (profundidade da fila * u.t), para a profundidade média
+        self.lastQueueChange = 0
+
+    def serviceTime(self, simulator, core=None):
+        # u.t até a E/S terminar: latência do dispositivo + transferência dos blocos. Com DMA a
+        # transferência disputa o canal; sem DMA o núcleo que pediu a E/S ('core', por padrão o
+        # que está rodando) fica ocupado copiando
+        time = simulator.timeSinceStart
+        latency = self.latency.sample()
+        if self.channel is not None:
+            return self.channel.reserve(time + latency, self.blocks, time) - time
+        copy = self.blocks*simulator.configuration.programmedIOTime
+        if copy:
+            simulator.stallCPU(copy, core)
+        return latency + copy
+
+    def beginDeviceUse(self, process, simulator, duration=None, core=None):
+        # A E/S termina daqui a 'duration' u.t: em vez de contar o tempo a cada u.t, marca o evento
+        log(DEBUG, 'Beggining use of device %s', self.id)
+        if duration is None:
+            duration = self.serviceTime(simulator, core)
         self.tiedProcess = process
-        self.timeSinceLastIO = 0
+        if self.completed:
+            simulator.deviceBusy(1)
         self.completed = False
+        self.uses += 1
+        self.busySince = simulator.timeSinceStart
+        simulator.events.push(simulator.timeSinceStart + duration, IO_COMPLETION, self)
+
+    def enqueue(self, process, instruction, simulator):
+        # Dispositivo ocupado: o processo espera a sua vez na fila do dispositivo
+        self.queueChanged(simulator.timeSinceStart)
+        self.waiters.append((process, instruction, simulator.timeSinceStart, simulator.activeCore))
+        self.maxQueueDepth = max(self.maxQueueDepth, len(self.waiters))
+
+    def queueChanged(self, time):
+        self.queueArea += len(self.waiters)*(time - self.lastQueueChange)
+        self.lastQueueChange = time
+
+    def finishDeviceUse(self, simulator):
+        # Acorda o processo que usava o dispositivo e passa o dispositivo direto para o primeiro
+        # da fila, que continua bloqueado até a sua própria E/S terminar
+        time = simulator.timeSinceStart
+        self.completed = True
+        self.busyTime += time - self.busySince
+        log(INFO, '\nIO operation finished, so %s is now ready again!', self.tiedProcess.name)
+        simulator.wakeProcess(self.tiedProcess)
+        if not self.waiters:
+            self.tiedProcess = None
+            simulator.deviceBusy(-1)
+            return
+        self.queueChanged(time)
+        process, instruction, since, core = self.waiters.popleft()
+        wait = time - since
+        self.waits += 1
+        self.totalWait += wait
+        self.maxWait = max(self.maxWait, wait)
+        log(INFO, 'Device %s handed to %s (%s) after waiting %s u.t; %s still waiting.',
+            self.id, process.name, instruction, wait, len(self.waiters))
+        simulator.deviceBusy(-1)  # beginDeviceUse conta de novo
+        self.beginDeviceUse(process, simulator, core=core)  # a cópia (sem DMA) é do núcleo que pediu
+
+    def stats(self, time):
+        self.queueChanged(time)
+        return {'uses': self.uses, 'busyTime': self.busyTime,
+                'utilization': min(1.0, self.busyTime / time) if time else 0.0, 'waits': self.waits,
+                'averageWait': self.totalWait / self.waits if self.waits else 0.0,
+                'maxWait': self.maxWait, 'queueDepth': len(self.waiters),
+                'maxQueueDepth': self.maxQueueDepth,
+                'averageQueueDepth': self.queueArea / time if time else 0.0}
+
+
+def deviceKey(deviceId):
+    # Dispositivos numéricos ('P1 I 1') são indexados pelo número; os outros pelo nome ('P1 I disco')
+    return int(deviceId) if deviceId.lstrip('-').isdigit() else deviceId
 
 
 # Classes abaixo são referentes ao simulador/escalonador
 
+class Job:
+    # Um processo do ponto de vista do escalonador: o seu programa (as instruções dele no input,
+    # na ordem) e os tempos usados nas métricas (turnaround, espera, resposta)
+    __slots__ = ('name', 'program', 'bursts', 'pc', 'priority', 'sequence', 'arrival', 'firstRun',
+                 'finish', 'cpuTime', 'waitingTime', 'readySince', 'queued', 'level', 'generation',
+                 'dispatches', 'core', 'successor')
+
+    def __init__(self, _name, _sequence):
+        self.name = _name
+        self.program = []
+        self.bursts = []  # posição -> instruções até o fim do surto de CPU (próximo 'I' ou fim)
+        self.pc = 0
+        self.priority = 0  # prioridade estática ('P1 C 32 3'): menor número, mais prioritário
+        self.sequence = _sequence  # ordem de chegada (desempate)
+        self.arrival = None
+        self.firstRun = None
+        self.finish = None
+        self.cpuTime = 0
+        self.waitingTime = 0  # tempo total na fila de prontos
+        self.readySince = 0
+        self.queued = False
+        self.level = 0  # fila atual no MLFQ
+        self.generation = 0  # último 'boost' do MLFQ visto pelo processo
+        self.dispatches = 0
+        self.core = None  # último núcleo onde o processo rodou
+        self.successor = None  # próxima encarnação do processo ('C' depois do 'T' dele no input)
+
+    def computeBursts(self):
+        # Uma passada de trás pra frente: o surto de CPU vai até o próximo 'I' (inclusive)
+        self.bursts = [0]*len(self.program)
+        following = 0
+        for i in range(len(self.program) - 1, -1, -1):
+            if self.program[i].action == 'I':
+                following = 0
+            following += 1
+            self.bursts[i] = following
+
+    def nextBurst(self):
+        return self.bursts[self.pc]
+
+
+class SchedulingPolicy:
+    # Interface das políticas de escalonamento da CPU. O simulador chama admit() quando um processo
+    # chega ou acorda, preempted() quando ele perde a CPU sem bloquear (quantum esgotado ou
+    # preempção por prioridade) e pickNext() para escolher quem roda
+    name = 'BASE'
+
+    def __init__(self, quantum=None):
+        self.quantum = quantum
+
+    def admit(self, job, time):
+        raise NotImplementedError
+
+    def preempted(self, job, time, quantumExpired):
+        self.admit(job, time)
+
+    def pickNext(self, time):
+        raise NotImplementedError
+
+    def hasReady(self):
+        raise NotImplementedError
+
+    def readyCount(self):
+        # Tamanho da fila de prontos (usado para escolher de qual núcleo roubar trabalho)
+        raise NotImplementedError
+
+    def steal(self, time):
+        # Tira um processo da fila para outro núcleo (ocioso) rodar. O dono da fila está ocupado,
+        # então o ladrão leva quem o dono rodaria a seguir
+        return self.pickNext(time)
+
+    def timeSlice(self, job):
+        # Quantum do processo que vai rodar (None: roda até bloquear ou terminar)
+        return None
+
+    def shouldPreempt(self, job, current):
+        # True se 'job', que acabou de ficar pronto, deve tirar 'current' da CPU
+        return False
+
+
+class FCFSPolicy(SchedulingPolicy):
+    # Primeiro a chegar, primeiro a ser servido (fila simples, sem preempção)
+    name = 'FCFS'
+
+    def __init__(self, quantum=None):
+        super().__init__(quantum)
+        self.queue = deque()
+
+    def admit(self, job, time):
+        self.queue.append(job)
+
+    def pickNext(self, time):
+        if not self.queue:
+            return None
+        return self.queue.popleft()
+
+    def hasReady(self):
+        return bool(self.queue)
+
+    def readyCount(self):
+        return len(self.queue)
+
+
+class RoundRobinPolicy(FCFSPolicy):
+    # Round-robin: como o FCFS, mas cada processo roda no máximo 'quantum' u.t e volta ao fim da fila
+    name = 'RR'
+
+    def __init__(self, quantum=2):
+        super().__init__(quantum)
+
+    def timeSlice(self, job):
+        return self.quantum
+
+
+class PriorityPolicy(SchedulingPolicy):
+    # Prioridade estática preemptiva: heap por (prioridade, ordem de entrada na fila)
+    name = 'PRIORITY'
+
+    def __init__(self, quantum=None):
+        super().__init__(quantum)
+        self.heap = []
+        self.counter = 0
+
+    def key(self, job):
+        return job.priority
+
+    def admit(self, job, time):
+        self.counter += 1
+        heapq.heappush(self.heap, (self.key(job), self.counter, job))
+
+    def pickNext(self, time):
+        if not self.heap:
+            return None
+        return heapq.heappop(self.heap)[2]
+
+    def hasReady(self):
+        return bool(self.heap)
+
+    def readyCount(self):
+        return len(self.heap)
+
+    def shouldPreempt(self, job, current):
+        return self.key(job) < self.key(current)
+
+
+class SJFPolicy(PriorityPolicy):
+    # Shortest-job-first (não preemptivo): roda o processo com o menor próximo surto de CPU,
+    # contado no programa dele (instruções até o próximo 'I')
+    name = 'SJF'
+
+    def key(self, job):
+        return job.nextBurst()
+
+    def shouldPreempt(self, job, current):
+        return False
+
+
+class MLFQPolicy(SchedulingPolicy):
+    # Multilevel feedback queue: 'levels' filas round-robin, com quantum que dobra a cada nível.
+    # Quem esgota o quantum desce um nível; quem bloqueia antes fica onde está; um processo de
+    # nível mais alto que fica pronto preempta um de nível mais baixo. A cada 'boostInterval' u.t
+    # todos voltam para o nível mais alto (evita inanição)
+    name = 'MLFQ'
+
+    def __init__(self, quantum=2, levels=3, boostInterval=100):
+        super().__init__(quantum)
+        self.queues = [deque() for _ in range(levels)]
+        self.boostInterval = boostInterval
+        self.lastBoost = 0
+        self.generation = 0
+
+    def refresh(self, job):
+        if job.generation != self.generation:
+            job.generation = self.generation
+            job.level = 0
+
+    def admit(self, job, time):
+        self.refresh(job)
+        self.queues[job.level].append(job)
+
+    def preempted(self, job, time, quantumExpired):
+        self.refresh(job)
+        if quantumExpired:
+            job.level = min(job.level + 1, len(self.queues) - 1)
+        self.queues[job.level].append(job)
+
+    def boost(self, time):
+        self.lastBoost = time
+        self.generation += 1
+        for queue in self.queues[1:]:
+            while queue:
+                job = queue.popleft()
+                self.refresh(job)
+                self.queues[0].append(job)
+
+    def pickNext(self, time):
+        if self.boostInterval and time - self.lastBoost >= self.boostInterval:
+            self.boost(time)
+        for queue in self.queues:
+            if queue:
+                return queue.popleft()
+        return None
+
+    def hasReady(self):
+        return any(self.queues)
+
+    def readyCount(self):
+        return sum(len(queue) for queue in self.queues)
+
+    def timeSlice(self, job):
+        return self.quantum*(2**job.level)
+
+    def shouldPreempt(self, job, current):
+        return job.level < current.level
+
+
+SCHEDULING_POLICIES = {
+    'FCFS': FCFSPolicy,
+    'RR': RoundRobinPolicy,
+    'PRIORITY': PriorityPolicy,
+    'SJF': SJFPolicy,
+    'MLFQ': MLFQPolicy,
+}
+
+
+def makeSchedulingPolicy(name, quantum=2):
+    # Cria a política de escalonamento a partir do nome (ex: 'RR', 'MLFQ')
+    try:
+        policyClass = SCHEDULING_POLICIES[name.upper()]
+    except KeyError:
+        raise ValueError('Unknown scheduling policy: ' + str(name) +
+                         ' (available: ' + ', '.join(SCHEDULING_POLICIES) + ')')
+    return policyClass(quantum)
+
+
+class Core:
+    # Um processador simulado: fila de prontos própria (uma instância da política de escalonamento),
+    # o processo que está rodando nele e os contadores de uso
+    __slots__ = ('id', 'scheduler', 'currentJob', 'runningProcess', 'preemptRequested', 'busyTicks',
+                 'contextSwitches', 'faults', 'steals', 'stalledUntil')
+
+    def __init__(self, _id, _scheduler):
+        self.id = _id
+        self.scheduler = _scheduler
+        self.currentJob = None
+        self.runningProcess = None  # último processo colocado em execução neste núcleo
+        self.preemptRequested = None  # motivo da preempção pedida ('quantum' ou 'priority')
+        self.busyTicks = 0
+        self.contextSwitches = 0
+        self.faults = 0  # faltas de página causadas por instruções rodadas neste núcleo
+        self.steals = 0  # processos roubados da fila de outro núcleo
+        self.stalledUntil = 0  # núcleo ocupado copiando dados de E/S programada até este instante
+
+    def load(self):
+        return self.scheduler.readyCount() + (self.currentJob is not None)
+
+
 class Simulator:  # classe 'principal' do sistema, que pega o input da professora e simula ele instrução por instrução
     # criando os respectivos processos, executando cada instrução, e td mais q um kernel deve ter q fzr
 
@@ -387,61 +2596,433 @@ class Simulator:  # classe 'principal' do sistema, que pega o input da professor
         self.configuration.setSimulation(self)
         self.MP = _configuration.MP
         self.MS = _configuration.MS
-        self.images = []
-        self.ioDevices = []
-        self.instructionBacklog = []
-        self.priorityInstructions = []
+        self.images = {}  # nome -> processo
+        self.ioDevices = {}  # id -> dispositivo
+        self.busyDevices = 0  # dispositivos com E/S em andamento
+        # sobreposição CPU/E-S: u.t com instrução rodando, com E/S em andamento, e com as duas
+        self.cpuTicks = 0
+        self.overlapTicks = 0
+        self.ioBusyTime = 0
+        self.ioBusySince = 0
+        self.stallTicks = 0  # u.t de CPU gastas copiando dados de E/S programada (sem DMA)
+        self.heldInstructions = {}  # nome do processo -> fila (FIFO) das suas instruções retidas
+        self.heldCount = 0
+        self.readyQueue = deque()  # processos acordados com instruções retidas para rodar
+        self.readyNames = set()
         self.timeSinceStart = 0
+        self.instructionsExecuted = 0
+        self.instructionsSkipped = 0  # instruções de processos que não existem
+        self.runningProcess = None  # último processo colocado em execução
+        # núcleo de eventos discretos: o tempo anda de u.t em u.t enquanto há instruções para rodar,
+        # e pula direto para o próximo evento quando a CPU está ociosa
+        self.events = EventQueue()
+        self.eventHandlers = {IO_COMPLETION: self.ioCompleted, TIMER: self.timerInterrupt,
+                              ARRIVAL: self.jobArrived, QUANTUM_EXPIRY: self.quantumExpired}
+        self.timerPending = False
+        # escalonamento (None: as instruções rodam na ordem do input, num único processador)
+        self.scheduler = None
+        if _configuration.schedulingPolicy is not None:
+            self.scheduler = makeSchedulingPolicy(_configuration.schedulingPolicy, _configuration.quantum)
+        # cada núcleo tem a sua própria fila de prontos (o núcleo 0 usa a instância acima)
+        self.cores = [Core(0, self.scheduler)]
+        for i in range(1, _configuration.cores):
+            self.cores.append(Core(i, makeSchedulingPolicy(_configuration.schedulingPolicy,
+                                                           _configuration.quantum)))
+        self.activeCore = self.cores[0]  # núcleo que está rodando a instrução atual
+        self.jobs = {}  # nome do processo -> Job da encarnação atual
+        self.allJobs = []  # todos os Jobs, na ordem de admissão (inclusive de processos recriados)
+        self.pendingArrivals = 0
+        self.unfinishedJobs = 0
+        self.contextSwitches = 0
+        self.migrations = 0  # vezes que um processo voltou a rodar num núcleo diferente do anterior
+        self.runStart = self.runEnd = 0
 
-    # percorre o arquivo linearmente, e para cada instrução, chama a função 'runInstruction' nela
     def simulate(self, input):
+        # políticas offline (OPT) precisam conhecer toda a sequência de referências antes de começar
+        self.MP.replacementPolicy.prepare(input, self.configuration.numberOfIntsPerFrame)
+        self.startTimer()
+        if self.scheduler is None:
+            self.runInput(input)
+        else:
+            self.runScheduled(input)
+
+    # percorre o arquivo linearmente, e para cada instrução, chama a função 'runInstruction' nela.
+    # Instruções de processos bloqueados/suspensos ficam retidas na fila do próprio processo (na
+    # ordem do input); quando o processo acorda, ele entra na fila de prontos e suas instruções
+    # retidas rodam com prioridade sobre o resto do input. Um único laço, sem recursão
+    def runInput(self, input):
         self.PC = 0
         self.inputInsts = input
-        while (self.PC < len(input.instructions)):
-            # roda a instrução atual
-            self.timeSinceStart+=1 #aumenta a variável referente ao tempo
-
-            #if else de determinar se proxima instrução sera será da fila de prioridade ou não
-            if(len(self.priorityInstructions) == 0):#se não for:
-                print('\n Running instruction ' + self.inputInsts.instructions[self.PC].toString() )
-                instructionBlocked = not self.runInstruction(self.inputInsts.instructions[self.PC])
-
-                if not(instructionBlocked):
-                 #após concluir u.t atual, atualiza os dispositivos para ver se algum IO acabou
-                    self.passTimeForAllRunningDevices()
-                else: #if instruction was blocked
-                    self.instructionBacklog.append(self.inputInsts.instructions[self.PC])
-                self.PC += 1
-            else: #se for de prioridade (ou seja, uma instrução que havia sido bloqueada foi escolhida)
-                print('\n Running instruction ' + self.priorityInstructions[0].toString() +' with priority.')
-                instructionBlocked = not self.runInstruction(self.priorityInstructions[0])
-                temp = self.priorityInstructions.remove(self.priorityInstructions[0])
-                if not(instructionBlocked):
-                #após concluir u.t atual, atualiza os dispositivos para ver se algum IO acabou
-                    self.instructionBacklog.remove(temp)
-                    self.passTimeForAllRunningDevices()
-                else: #if instruction was blocked
-                    self.instructionBacklog.append(temp)
-        if(len(self.instructionBacklog)+len(self.priorityInstructions)>0): #se ainda falta instruções pra executar qdo normalmente teria acabado
-            print('\n---No ready processes to execute---')
-            print('---OS on hold while waiting for I/O to finish.---\n')
-            self.passTimeForAllRunningDevices()
-            newInput = []
-            for ins in self.priorityInstructions:
-                newInput.append(ins)
-            for ins in self.instructionBacklog:
-                if(ins not in newInput):    
-                    newInput.append(ins)
-            self.priorityInstructions = []
-            self.instructionBacklog = []
-            inp = Input(newInput)
-            print('Instructions still waiting to finish: ' + inp.toString())
-            self.simulate(inp) #re inicia a função de simulação só com as que faltam executar
-    
-    def passTimeForAllRunningDevices(self):
-        for device in self.ioDevices:
-            if not(device.completed):
-                device.passTime()
+        self.runStart = self.timeSinceStart
+        instructions = input.instructions
+        cpu = self.cores[0]
+        while True:
+            if self.readyQueue or self.PC < len(instructions):
+                self.timeSinceStart+=1 #aumenta a variável referente ao tempo
+                self.processEvents()
+                if self.timeSinceStart <= cpu.stalledUntil:
+                    continue  # CPU ocupada copiando dados de E/S programada
+                self.countCPUTick()
+                if self.readyQueue:  # instrução retida de um processo que acordou
+                    self.runHeldInstruction()
+                else:
+                    instruction = instructions[self.PC]
+                    self.PC += 1
+                    log(INFO, '\n Running instruction %s', instruction)
+                    if instruction.process_name in self.heldInstructions:
+                        # o processo ainda tem instruções retidas: esta espera atrás delas
+                        log(INFO, ' %s was put on hold behind earlier instructions of its process.',
+                            instruction)
+                        self.holdInstruction(instruction)
+                    elif not self.runInstruction(instruction):
+                        self.holdInstruction(instruction)
+            elif self.heldCount > 0:  # se ainda falta instruções pra executar qdo normalmente teria acabado
+                log(INFO, '\n---No ready processes to execute---')
+                log(INFO, '---OS on hold while waiting for I/O to finish.---\n')
+                if self.MP.loadControl is not None:
+                    self.MP.loadControl.idle()
+                if not self.waitForNextEvent():
+                    if self.MP.loadControl is not None and self.MP.loadControl.suspended:
+                        continue  # ainda há processos suspensos para readmitir
+                    log(INFO, '---No pending event can wake the %s instructions still on hold, stopping.---',
+                        self.heldCount)
+                    break
+                log(INFO, 'Instructions still waiting to finish: %s', self.heldCount)
+            else:
+                break
+        self.runEnd = self.timeSinceStart
+
+    # Com uma política de escalonamento, o input vira um programa por processo: cada processo
+    # chega no instante em que a primeira instrução dele apareceria no input, e a política
+    # decide quem usa a CPU a cada u.t. Com vários núcleos, todos rodam uma instrução por u.t;
+    # núcleo sem nada na própria fila rouba trabalho da fila mais cheia. A MP é uma só, então as
+    # faltas de página de todos os núcleos disputam os mesmos quadros
+    def runScheduled(self, input):
+        self.inputInsts = input
+        self.runStart = self.timeSinceStart
+        self.admitJobs(input)
+        ranUntil = self.timeSinceStart  # último u.t em que os núcleos já rodaram
+        while True:
+            if not any(core.currentJob is not None for core in self.cores) and not self.hasReady():
+                if self.unfinishedJobs == 0:
+                    break
+                if self.busyDevices > 0:
+                    log(INFO, '\n---No ready processes to execute---')
+                    log(INFO, '---OS on hold while waiting for I/O to finish.---\n')
+                if self.MP.loadControl is not None:
+                    self.MP.loadControl.idle()
+                if not self.waitForNextEvent():
+                    if self.MP.loadControl is not None and self.MP.loadControl.suspended:
+                        continue  # ainda há processos suspensos para readmitir
+                    log(INFO, '---No pending event can wake the %s unfinished processes, stopping.---',
+                        self.unfinishedJobs)
+                    break
+                continue
+            # se a espera ociosa parou num u.t novo, os eventos dele já foram tratados e quem
+            # chegou ou acordou roda nesse mesmo u.t
+            if self.timeSinceStart == ranUntil:
+                self.timeSinceStart += 1
+                self.processEvents()
+            ranUntil = self.timeSinceStart
+            ran = False
+            for core in self.cores:
+                self.activeCore = core
+                if self.timeSinceStart <= core.stalledUntil:
+                    continue  # núcleo ocupado copiando dados de E/S programada
+                job = core.currentJob
+                if job is not None and core.preemptRequested is not None:
+                    log(INFO, '\n Preempting %s (%s).', job.name, core.preemptRequested)
+                    self.leaveCPU(core)
+                    self.makeReady(job, core.preemptRequested == 'quantum', core)
+                    job = None
+                core.preemptRequested = None
+                if job is None:
+                    job = self.dispatchNext(core)
+                    if job is None:
+                        continue
+                if not ran:
+                    ran = True
+                    self.countCPUTick()
+                core.busyTicks += 1
+                faults = self.MP.replacementPolicy.faults
+                self.runJobInstruction(job, core)
+                core.faults += self.MP.replacementPolicy.faults - faults
+            self.activeCore = self.cores[0]
+        self.runEnd = self.timeSinceStart
+
+    def hasReady(self):
+        for core in self.cores:
+            if core.scheduler.hasReady():
+                return True
+        return False
+
+    def admitJobs(self, input):
+        jobs = []
+        for position, instruction in enumerate(input.instructions):
+            job = self.jobs.get(instruction.process_name)
+            while job is not None and job.successor is not None:
+                job = job.successor
+            # criar de novo um processo depois do 'T' dele começa outra encarnação (outro Job)
+            restarted = (job is not None and instruction.action in ('C', 'F') and
+                         job.program and job.program[-1].action == 'T')
+            if job is None or restarted:
+                newJob = Job(instruction.process_name, len(self.allJobs))
+                if job is None:
+                    self.jobs[instruction.process_name] = newJob
+                else:
+                    job.successor = newJob
+                job = newJob
+                self.allJobs.append(job)
+                jobs.append(job)
+                self.events.push(self.timeSinceStart + position + 1, ARRIVAL, job)
+                self.pendingArrivals += 1
+                self.unfinishedJobs += 1
+            if instruction.action == 'C' and len(instruction.args) > 1:
+                job.priority = int(instruction.args[1])
+            job.program.append(instruction)
+        for job in jobs:
+            job.computeBursts()
+
+    def jobArrived(self, job):
+        self.pendingArrivals -= 1
+        job.arrival = self.timeSinceStart
+        current = self.jobs[job.name]
+        if current is not job:
+            if current.finish is None:  # espera a encarnação anterior terminar (ver runJobInstruction)
+                return
+            self.jobs[job.name] = job
+        self.makeReady(job)
+
+    def makeReady(self, job, quantumExpired=None, core=None):
+        # Coloca o processo na fila de prontos (chegada, volta do bloqueio ou preempção). Sem núcleo
+        # indicado, volta para o último núcleo onde rodou (afinidade) ou, se nunca rodou, para o
+        # núcleo menos carregado
+        if core is None:
+            core = self.cores[job.core] if job.core is not None else min(self.cores, key=Core.load)
+        job.readySince = self.timeSinceStart
+        job.queued = True
+        if quantumExpired is None:
+            core.scheduler.admit(job, self.timeSinceStart)
+            current = core.currentJob
+            if current is not None and core.scheduler.shouldPreempt(job, current):
+                core.preemptRequested = 'priority'
+        else:
+            core.scheduler.preempted(job, self.timeSinceStart, quantumExpired)
+
+    def dispatchNext(self, core):
+        job = core.scheduler.pickNext(self.timeSinceStart)
+        if job is None:
+            job = self.stealJob(core)
+            if job is None:
+                return None
+        job.queued = False
+        job.waitingTime += self.timeSinceStart - job.readySince
+        if job.firstRun is None:
+            job.firstRun = self.timeSinceStart
+        elif job.core != core.id:
+            self.migrations += 1
+        job.core = core.id
+        job.dispatches += 1
+        core.currentJob = job
+        timeSlice = core.scheduler.timeSlice(job)
+        if timeSlice is not None:
+            self.events.push(self.timeSinceStart + timeSlice, QUANTUM_EXPIRY, (job, job.dispatches))
+        return job
+
+    def stealJob(self, core):
+        # Núcleo ocioso: rouba um processo da fila de prontos mais cheia
+        victim = max(self.cores, key=lambda c: c.scheduler.readyCount())
+        if victim is core or not victim.scheduler.hasReady():
+            return None
+        job = victim.scheduler.steal(self.timeSinceStart)
+        if job is not None:
+            core.steals += 1
+            log(INFO, '\n Core %s stole %s from core %s.', core.id, job.name, victim.id)
+        return job
+
+    def quantumExpired(self, payload):
+        job, dispatch = payload
+        if job.core is not None:
+            core = self.cores[job.core]
+            if job is core.currentJob and job.dispatches == dispatch:
+                core.preemptRequested = 'quantum'
+
+    def isRunning(self, job):
+        return job.core is not None and self.cores[job.core].currentJob is job
+
+    def leaveCPU(self, core):
+        # O processo do núcleo sai da CPU (preempção, bloqueio ou fim); se não bloqueou, fica pronto
+        process = self.images.get(core.currentJob.name)
+        if process is not None and process.state == 'executing':
+            process.state = 'ready'
+        core.currentJob = None
+
+    def runJobInstruction(self, job, core):
+        instruction = job.program[job.pc]
+        if len(self.cores) > 1:
+            log(INFO, '\n Running instruction %s on core %s', instruction, core.id)
+        else:
+            log(INFO, '\n Running instruction %s', instruction)
+        ran = self.runInstruction(instruction)
+        if ran:
+            job.pc += 1
+            job.cpuTime += 1
+        if job.pc == len(job.program):  # fim do programa do processo
+            job.finish = self.timeSinceStart
+            self.unfinishedJobs -= 1
+            self.leaveCPU(core)
+            successor = job.successor
+            if successor is not None and successor.arrival is not None:  # já chegou e esperava esta
+                self.jobs[job.name] = successor
+                self.makeReady(successor)
+            return
+        process = self.images.get(job.name)
+        if not ran or (process is not None and process.state in ('blocked', 'suspended')):
+            self.leaveCPU(core)  # sai da CPU até ser acordado (ver wakeProcess)
+
+    def schedulingStats(self):
+        # Métricas por processo (turnaround, espera na fila de prontos, resposta) e médias
+        perProcess = {}
+        incarnations = {}
+        for job in self.allJobs:
+            incarnations[job.name] = incarnations.get(job.name, 0) + 1
+            if job.finish is None:
+                continue
+            name = job.name if incarnations[job.name] == 1 else job.name + '#' + str(incarnations[job.name])
+            perProcess[name] = {'arrival': job.arrival, 'firstRun': job.firstRun,
+                                    'finish': job.finish, 'cpuTime': job.cpuTime,
+                                    'turnaround': job.finish - job.arrival + 1,
+                                    'waiting': job.waitingTime,
+                                    'response': job.firstRun - job.arrival}
+        stats = {'policy': self.scheduler.name if self.scheduler is not None else 'INPUT_ORDER',
+                 'processes': perProcess, 'contextSwitches': self.contextSwitches,
+                 'migrations': self.migrations}
+        elapsed = self.runEnd - self.runStart
+        stats['cores'] = [{'busyTicks': core.busyTicks,
+                           'utilization': core.busyTicks / elapsed if elapsed else 0.0,
+                           'contextSwitches': core.contextSwitches, 'faults': core.faults,
+                           'steals': core.steals} for core in self.cores]
+        if perProcess:
+            for metric in ('turnaround', 'waiting', 'response'):
+                stats['average' + metric.capitalize()] = (
+                    sum(p[metric] for p in perProcess.values()) / len(perProcess))
+            makespan = (max(p['finish'] for p in perProcess.values()) -
+                        min(p['arrival'] for p in perProcess.values()) + 1)
+            stats['makespan'] = makespan
+            stats['throughput'] = len(perProcess) / makespan
+        return stats
+
+    def printSchedulingStats(self):
+        stats = self.schedulingStats()
+        log(INFO, 'Scheduling (%s): %s context switches.', stats['policy'], stats['contextSwitches'])
+        for name, p in stats['processes'].items():
+            log(INFO, ' %s: turnaround %s, waiting %s, response %s u.t',
+                name, p['turnaround'], p['waiting'], p['response'])
+        if stats['processes']:
+            log(INFO, ' Average turnaround %.2f, waiting %.2f, response %.2f u.t; throughput %.3f '
+                      'processes/u.t',
+                stats['averageTurnaround'], stats['averageWaiting'], stats['averageResponse'],
+                stats['throughput'])
+        if len(stats['cores']) > 1:
+            log(INFO, ' %s cores, %s migrations.', len(stats['cores']), stats['migrations'])
+            for i, core in enumerate(stats['cores']):
+                log(INFO, ' Core %s: %.1f%% busy, %s context switches, %s page faults, %s steals.',
+                    i, core['utilization']*100, core['contextSwitches'], core['faults'], core['steals'])
+
+    def holdInstruction(self, instruction):
+        queue = self.heldInstructions.get(instruction.process_name)
+        if queue is None:
+            queue = self.heldInstructions[instruction.process_name] = deque()
+        queue.append(instruction)
+        self.heldCount += 1
+
+    def runHeldInstruction(self):
+        # Roda a próxima instrução retida do primeiro processo da fila de prontos
+        name = self.readyQueue[0]
+        queue = self.heldInstructions[name]
+        instruction = queue[0]
+        log(INFO, '\n Running instruction %s with priority.', instruction)
+        if self.runInstruction(instruction):
+            queue.popleft()
+            self.heldCount -= 1
+            if queue:
+                return  # continua com o mesmo processo
+            del self.heldInstructions[name]
+        # bloqueou de novo (ou acabou): sai da fila de prontos até ser acordado outra vez
+        self.readyQueue.popleft()
+        self.readyNames.discard(name)
+
+    def processEvents(self):
+        # Trata os eventos marcados até o instante atual (custo proporcional aos eventos, não às u.t)
+        for kind, payload in self.events.popDue(self.timeSinceStart):
+            self.eventHandlers[kind](payload)
+
+    def waitForNextEvent(self):
+        # CPU ociosa: o tempo pula direto de evento em evento (em vez de andar de 1 em 1 u.t) até
+        # algum processo acordar. Retorna False se nenhum evento pendente pode acordar alguém
+        while not (self.readyQueue or (self.scheduler is not None and self.hasReady())):
+            nextTime = self.events.nextTime()
+            if nextTime is None or (self.pendingArrivals == 0 and
+                                    self.busyDevices == 0):
+                return False
+            self.timeSinceStart = max(self.timeSinceStart, nextTime)
+            self.processEvents()
+        return True
+
+    def startTimer(self):
+        # A interrupção de relógio só é programada se há tarefas de fundo no kernel ('tickless')
+        if self.timerPending:
+            return
+        if self.MP.writeBackDaemon is not None or self.MP.loadControl is not None:
+            self.events.push(self.timeSinceStart + self.configuration.timerInterval, TIMER)
+            self.timerPending = True
+
+    def timerInterrupt(self, payload):
+        self.timerPending = False
+        self.runKernelDaemons()
+        self.startTimer()
+
+    def runKernelDaemons(self):
+        # tarefas de fundo do 'kernel' que rodam a cada interrupção de relógio (ex: write-back das páginas sujas)
+        if self.MP.writeBackDaemon is not None:
+            self.MP.writeBackDaemon.tick(self.timeSinceStart)
+        if self.MP.loadControl is not None:
+            self.MP.loadControl.tick(self.timeSinceStart)
+
+    def ioCompleted(self, device):
+        device.finishDeviceUse(self)
+
+    def deviceBusy(self, delta):
+        # Um dispositivo começou (+1) ou terminou (-1) de atender; acumula o tempo com E/S em andamento
+        if self.busyDevices > 0:
+            self.ioBusyTime += self.timeSinceStart - self.ioBusySince
+        self.ioBusySince = self.timeSinceStart
+        self.busyDevices += delta
+
+    def stallCPU(self, duration, core=None):
+        # E/S programada: o núcleo que pediu a E/S (por padrão o que está rodando) fica 'duration' u.t
+        # copiando os dados
+        if core is None:
+            core = self.activeCore
+        core.stalledUntil = max(core.stalledUntil, self.timeSinceStart) + duration
+        self.stallTicks += duration
+
+    def countCPUTick(self):
+        self.cpuTicks += 1
+        if self.busyDevices > 0:
+            self.overlapTicks += 1
+
+    def wakeProcess(self, process):
+        # Processo volta a ficar pronto: se tem instruções retidas, entra na fila de prontos
+        process.state = 'ready'
+        if self.scheduler is not None:
+            job = self.jobs.get(process.name)
+            if job is not None and not self.isRunning(job) and not job.queued and job.finish is None:
+                self.makeReady(job)
+            return
+        if process.name in self.heldInstructions and process.name not in self.readyNames:
+            self.readyQueue.append(process.name)
+            self.readyNames.add(process.name)
     def runInstruction(self, instruction):  # código que processa cada instrução
 
         # Toda instrução do input é dividida em várias partes no exemplo dela,  (e aq uso o split para separa-las)
@@ -452,14 +3033,31 @@ class Simulator:  # classe 'principal' do sistema, que pega o input da professor
 
         correspondingProcess = self.getProcess(instruction.process_name)
         correspondingInstruction = instruction.action
+        self.MP.replacementPolicy.advance(instruction)  # avança o 'relógio' de referências (OPT)
+        arity = INSTRUCTION_ARITY.get(correspondingInstruction)
+        if arity is not None and (len(instruction.args) < arity[0] or
+                                  arity[1] is not None and len(instruction.args) > arity[1]):
+            log(WARNING, ' %s skipped, wrong number of arguments.', instruction)
+            self.instructionsSkipped += 1
+            return True
+        if correspondingProcess is None and correspondingInstruction not in ('C', 'F'):
+            log(WARNING, ' %s skipped, process does not exist.', instruction)
+            self.instructionsSkipped += 1
+            return True
 
         if (correspondingInstruction == 'C'):  # o código de cada instrução pode estar aqui
             self.createProcess(instruction.process_name, instruction.args[0])
+        elif (correspondingInstruction == 'F'):  # fork: 'P2 F P1' cria P2 como cópia (COW) de P1
+            self.forkProcess(instruction.process_name, instruction.args[0])
         else:
             # coloca o processo no estado 'executando' se não bloqueado
             
-            if correspondingProcess.state == 'blocked' or correspondingProcess.state == 'suspended':
-                print(' '+ instruction.toString() + ' was put on hold due to process being blocked due to I/O operation.' )
+            if correspondingProcess.state == 'blocked':
+                log(INFO, ' %s was put on hold due to process being blocked due to I/O operation.',
+                    instruction)
+                return False
+            if correspondingProcess.state == 'suspended':
+                log(INFO, ' %s was put on hold due to process being suspended.', instruction)
                 return False
             self.executeProcess(correspondingProcess)
 
@@ -474,101 +3072,215 @@ class Simulator:  # classe 'principal' do sistema, que pega o input da professor
         elif (correspondingInstruction == 'P'):  # o código de cada instrução pode estar aqui
             self.runCPUinst(correspondingProcess, instruction.args[0])
         elif (correspondingInstruction == 'I'):  # o código de cada instrução pode estar aqui
-            deviceId = instruction.args[0]
-            for device in self.ioDevices: #testa se dispostivo que quer acessar já está em uso
-                if(device.id == int(deviceId) and not device.completed): #e bloquea a instrução se estiver
-                    print(' '+ instruction.toString() + ' was put on hold due to device being on use already. Corresponding process now blocked.' )
-                    correspondingProcess.state = 'blocked'
-                    return False
-            self.runIOinst(correspondingProcess, instruction.args[0])
+            self.runIOinst(correspondingProcess, instruction.args[0], instruction)
         elif (correspondingInstruction == 'T'):  # o código de cada instrução pode estar aqui
             self.endProcess(correspondingProcess)
-
+        elif (correspondingInstruction == 'G'):  # 'P1 G seg 64' cria o segmento compartilhado 'seg'
+            self.createSegment(instruction.args[0], instruction.args[1])
+        elif (correspondingInstruction == 'A'):  # 'P1 A seg [endereço]' anexa o segmento ao processo
+            virtualAddress = instruction.args[1] if len(instruction.args) > 1 else None
+            self.attachSegment(correspondingProcess, instruction.args[0], virtualAddress)
+        elif (correspondingInstruction == 'D'):  # 'P1 D seg' desanexa o segmento do processo
+            self.detachSegment(correspondingProcess, instruction.args[0])
+
+        self.instructionsExecuted += 1
         return True
 
-    def getProcess(self, processname):  # tenho q atualizar
-        for process in self.images:
-            if (process.name == processname):
-                return process
-        print(' Process not found in memory yet.')
-        return None
-
     # Funções a seguir são chamadas para executar cada instrução do input, como tá lá no docs da profa
     def createProcess(self, processName, desiredSize):  # instrução C
-        print(' Creating new process...')
+        if processName in self.images:
+            log(WARNING, ' Cannot create %s: process already exists.', processName)
+            return
+        log(INFO, ' Creating new process...')
+        pages = math.ceil(int(desiredSize) / self.configuration.numberOfIntsPerFrame)
+        if not self.reserveSwap(pages):
+            log(WARNING, ' Cannot create %s: secondary memory cannot reserve its %s pages.', processName, pages)
+            return
         # processo de alocaçõa é feito automaticamente na criação de um objeto Process()
         p = Process(processName, 'New', int(desiredSize), self.configuration)
-        self.images.append(p)
+        self.images[processName] = p
+
+    def forkProcess(self, childName, parentName):  # instrução F
+        parent = self.getProcess(parentName)
+        if parent is None:
+            log(WARNING, ' Cannot fork %s: %s does not exist.', childName, parentName)
+            return
+        if childName in self.images:
+            log(WARNING, ' Cannot fork %s: process already exists.', childName)
+            return
+        if not self.reserveSwap(parent.numberOfPages):
+            log(WARNING, ' Cannot fork %s: secondary memory cannot reserve its %s pages.',
+                childName, parent.numberOfPages)
+            return
+        log(INFO, ' Forking %s into %s (copy-on-write)...', parentName, childName)
+        p = Process(childName, 'New', parent.size, self.configuration, parent)
+        self.images[childName] = p
+
+    def createSegment(self, name, size):  # instrução G
+        if name in self.MP.sharedSegments:
+            log(WARNING, ' Shared segment %s already exists.', name)
+            return
+        segment = SharedSegment(name, int(size), self.configuration)
+        if not self.reserveSwap(segment.numberOfPages):
+            log(WARNING, ' Cannot create segment %s: secondary memory cannot reserve its %s pages.',
+                name, segment.numberOfPages)
+            return
+        log(INFO, ' Creating shared segment %s with %s ints...', name, size)
+        self.MP.sharedSegments[name] = segment
+
+    def reserveSwap(self, pages):
+        # Na paginação por demanda, toda página futura precisa de um slot do swap garantido já na criação
+        return not self.configuration.demandPaging or self.MS.reserveSlots(pages)
+
+    def attachSegment(self, process, name, virtualAddress=None):  # instrução A
+        segment = self.MP.sharedSegments.get(name)
+        if segment is None:
+            log(WARNING, ' Shared segment %s does not exist.', name)
+            return
+        base = None
+        if virtualAddress is not None:
+            if int(virtualAddress) % self.configuration.numberOfIntsPerFrame != 0:
+                log(WARNING, ' Virtual address %s is not page aligned.', virtualAddress)
+                return
+            base = int(virtualAddress)//self.configuration.numberOfIntsPerFrame
+        segment.attach(process, base)
+
+    def detachSegment(self, process, name):  # instrução D
+        segment = self.MP.sharedSegments.get(name)
+        if segment is None:
+            log(WARNING, ' Shared segment %s does not exist.', name)
+            return
+        segment.detach(process)
 
     def readFromMemory(self, process, virtualAddress):  # instrução R
-        print(' Reading from memory at virtual address',
-              virtualAddress, "by process", process.name, "...")
-        pageNo = int(virtualAddress)//self.configuration.numberOfIntsPerFrame
-        offset = int(virtualAddress)%self.configuration.numberOfIntsPerFrame
-        print(' Data found at page ' + process.name + '-(' + str(pageNo+1) +"), with offset " + str(offset))
-        page = process.pageTable.getPage(pageNo+1, self.configuration.MP)
+        log(INFO, ' Reading from memory at virtual address %s by process %s ...',
+            virtualAddress, process.name)
+        page, offset = self.translate(process, virtualAddress)
         if(page!=None):
-            print(' Page found in MP: ' + page.toString())
-            requestedData = page.data[offset] 
-            print(' Requested data is: <<' + str(requestedData) +'>>')
-        else:
-            print('Page fault')
-            self.configuration.MP.triggerPageFaultById(pageNo,self.configuration.MP) #acho que ainda não funciona muito bem isso
-            
+            log(DEBUG, ' Page found in MP: %s', page)
+            requestedData = page.readData(offset)
+            log(INFO, ' Requested data is: <<%s>>', requestedData)
+
     def writeToMemory(self, process, virtualAddress, data):  # instrução W
-        print(" Writing", data, "to memory at virtual address",
-              virtualAddress, "by process", process.name, "...")
-        pageNo = int(virtualAddress)//self.configuration.numberOfIntsPerFrame
-        offset = int(virtualAddress)%self.configuration.numberOfIntsPerFrame
-        print(' Data found at page ' + process.name + '-(' + str(pageNo+1) +"), with offset " + str(offset))
-        page = process.pageTable.getPage(pageNo+1, self.configuration.MP)
+        log(INFO, ' Writing %s to memory at virtual address %s by process %s ...',
+            data, virtualAddress, process.name)
+        try:
+            value = int(data)
+        except ValueError:
+            value = None
+        if value is None or not PAGE_INT_MIN <= value <= PAGE_INT_MAX:
+            # a página guarda inteiros de 64 bits: o valor nem chega a ser escrito
+            log(WARNING, ' Cannot write %s: memory holds integers from %s to %s.',
+                data, PAGE_INT_MIN, PAGE_INT_MAX)
+            return
+        page, offset = self.translate(process, virtualAddress)
+        if(page!=None and page.mappings!=None and page.segment==None):  # página compartilhada por fork: copia antes de escrever
+            page = self.MP.copyOnWrite(page, process, int(virtualAddress)//self.configuration.numberOfIntsPerFrame + 1)
         if(page!=None):
-            page.dirty = True
-            page.data[offset] = int(data)
-            print(' Page found in MP: ' + page.toString()) 
-            print(' Performing write operation in that adress...')
-            print(' Write operation in virtual adress ' + str(virtualAddress) + ' finished. Page is now "Dirty"')
-        else:
-            print('Page fault')
-            self.configuration.MP.triggerPageFaultById(pageNo,self.configuration.MP)
+            self.configuration.MP.markDirty(page)
+            page.data[offset] = value
+            log(DEBUG, ' Page found in MP: %s', page) 
+            log(DEBUG, ' Performing write operation in that adress...')
+            log(DEBUG, ' Write operation in virtual adress %s finished. Page is now "Dirty"', virtualAddress)
 
     def runCPUinst(self, process, virtualAddress):  # instrução P
-        print(' Running CPU instruction at virtual adress',
-              virtualAddress, "by process", process.name, "...")
-        pageNo = int(virtualAddress)//self.configuration.numberOfIntsPerFrame
-        offset = int(virtualAddress)%self.configuration.numberOfIntsPerFrame
-        print(' Data found at page ' + process.name + '-(' + str(pageNo+1) +"), with offset " + str(offset))
-        page = process.pageTable.getPage(pageNo+1, self.configuration.MP)
+        log(INFO, ' Running CPU instruction at virtual adress %s by process %s ...',
+            virtualAddress, process.name)
+        page, offset = self.translate(process, virtualAddress)
         if(page!=None):
-            print(' Page found in MP: ' + page.toString()) 
-            print(' Performing CPU operation in that adress...')
-            print(' CPU operation in virtual adress...' + str(virtualAddress) + ' finished.')
-        else:
-            print('Page fault')
-            self.configuration.MP.triggerPageFaultById(pageNo,self.configuration.MP)
+            log(DEBUG, ' Page found in MP: %s', page) 
+            log(DEBUG, ' Performing CPU operation in that adress...')
+            log(DEBUG, ' CPU operation in virtual adress...%s finished.', virtualAddress)
 
-    def runIOinst(self, process, deviceId):  # instrução I
-        print(' Running I/O instruction at device',
-              deviceId, "by process", process.name, "...")
-        print(' Process '+process.name +' has been blocked until device ' + str(deviceId) + ' finishes I/O. Should last 3 u.t')
+    def translate(self, process, virtualAddress):
+        # Traduz o endereço virtual para (página, deslocamento), passando primeiro pela TLB
+        pageNo = int(virtualAddress)//self.configuration.numberOfIntsPerFrame
+        offset = int(virtualAddress)%self.configuration.numberOfIntsPerFrame
+        bits = self.configuration.logicalAddressBits
+        if bits is not None and not (0 <= int(virtualAddress) < (1 << bits)):
+            log(WARNING, ' Virtual address %s is outside the %s-bit logical address space.',
+                virtualAddress, bits)
+            return None, offset
+        log(DEBUG, ' Data found at page %s-(%s), with offset %s', process.name, pageNo+1, offset)
+        if self.MP.readahead is not None:
+            self.MP.readahead.observe(process, pageNo+1)
+        if self.MP.loadControl is not None:
+            self.MP.loadControl.observe(process, pageNo+1)
+        tlb = self.MP.tlb
+        if tlb is not None:
+            page = tlb.lookup(process, pageNo+1)
+            if page is not None:  # hit na TLB: não precisa consultar a tabela de páginas
+                self.MP.touchPage(page)
+                return page, offset
+        # getPage já trata a falta de página (carregando a página na MP) e avisa a política do acesso
+        page = process.getPage(pageNo+1)
+        if tlb is not None and page is not None:
+            tlb.insert(process, pageNo+1, page)
+        return page, offset
+
+    def runIOinst(self, process, deviceId, instruction=None):  # instrução I
+        key = deviceKey(deviceId)
+        targetDevice = self.ioDevices.get(key)
         self.blockProcess(process)
-        deviceExists = False #código que verifica se dispostivo já existe
-        for device in self.ioDevices:
-            if(device.id == int(deviceId)):
-                deviceExists = True
-                targetDevice = device 
-        if(deviceExists):
-            targetDevice.beginDeviceUse(process)
-        else:
-            targetDevice = ioDevice(int(deviceId),self.configuration.averageIOTime)
-            targetDevice.beginDeviceUse(process)
-            self.ioDevices.append(targetDevice)
-        # temos também que criar alguma coisa relacionada ao dma provavelmente
+        if targetDevice is not None and not targetDevice.completed:
+            # dispositivo em uso: o processo entra na fila dele, já bloqueado
+            log(INFO, ' %s was queued on device %s (%s waiting). Corresponding process now blocked.',
+                instruction if instruction is not None else process.name, key,
+                len(targetDevice.waiters) + 1)
+            targetDevice.enqueue(process, instruction, self)
+            return
+        connecting = targetDevice is None
+        if connecting:  # primeiro uso do dispositivo
+            targetDevice = self.ioDevices[key] = self.configuration.newDevice(key)
+        duration = targetDevice.serviceTime(self)
+        log(INFO, ' Running I/O instruction at device %s by process %s ...', deviceId, process.name)
+        log(INFO, ' Process %s has been blocked until device %s finishes I/O. Should last %s u.t',
+            process.name, deviceId, duration)
+        if connecting:
+            log(INFO, 'Connecting device %s...', key)
+        targetDevice.beginDeviceUse(process, self, duration)
+
+    def ioStats(self):
+        # Quanto da E/S ficou escondida atrás de CPU: u.t com instrução rodando, com algum
+        # dispositivo ocupado, e com as duas coisas ao mesmo tempo
+        elapsed = self.runEnd - self.runStart
+        ioBusy = self.ioBusyTime
+        if self.busyDevices > 0:
+            ioBusy += self.timeSinceStart - self.ioBusySince
+        channels = {name: channel.stats(elapsed)
+                    for name, channel in self.configuration.dmaChannels.items()}
+        return {'elapsed': elapsed, 'cpuTicks': self.cpuTicks, 'ioBusyTime': ioBusy,
+                'overlapTicks': self.overlapTicks, 'stallTicks': self.stallTicks,
+                'cpuUtilization': self.cpuTicks / elapsed if elapsed else 0.0,
+                'overlap': self.overlapTicks / elapsed if elapsed else 0.0,
+                'devices': self.deviceStats(), 'channels': channels}
+
+    def printIOStats(self):
+        stats = self.ioStats()
+        log(INFO, 'CPU/I-O: %s u.t elapsed, CPU busy %s, I/O in flight %s, both at once %s (%.1f%%), %s u.t '
+                  'of CPU spent on programmed I/O.',
+            stats['elapsed'], stats['cpuTicks'], stats['ioBusyTime'], stats['overlapTicks'],
+            stats['overlap']*100, stats['stallTicks'])
+        self.printDeviceStats()
+        for name, channel in stats['channels'].items():
+            log(INFO, 'DMA channel %s: %s transfers, %s blocks, %.1f%% busy, average queue delay %.2f u.t',
+                name, channel['transfers'], channel['blocks'], channel['utilization']*100,
+                channel['averageQueueDelay'])
+
+    def deviceStats(self):
+        return {key: device.stats(self.timeSinceStart) for key, device in self.ioDevices.items()}
+
+    def printDeviceStats(self):
+        for key, stats in self.deviceStats().items():
+            log(INFO, 'Device %s: %s uses, busy %s u.t (%.1f%%), %s queued requests (average wait %.2f u.t, '
+                      'max %s), queue depth average %.2f, max %s.',
+                key, stats['uses'], stats['busyTime'], stats['utilization']*100, stats['waits'],
+                stats['averageWait'], stats['maxWait'], stats['averageQueueDepth'], stats['maxQueueDepth'])
 
     def endProcess(self, process):  # instrução T
-        self.images.remove(process)
+        del self.images[process.name]
         process.endProcess()
-        print(' Ending Process', process.name)
+        log(INFO, ' Ending Process %s', process.name)
 
     # funções a seguir servem para mudar o estado de processo, de acordo com aquele diagrama d estados lá
     def blockProcess(self, process):
@@ -576,26 +3288,98 @@ class Simulator:  # classe 'principal' do sistema, que pega o input da professor
         # fazer código para ativar DMA ou alguma coisa assim?
 
     def suspendProcess(self, process):
-        process.state = 'blocked'
-        # seguindo a logica do endprocess para retirar da mp
-        for p in self.pageTable.pageTable:
-            pageFrame = self.pageTable.getFrame(p, config.MP)
-            if not (pageFrame == None): 
-                pageFrame.liberatePage()
-                self.pageTable.removePageFromMP(p)
+        process.state = 'suspended'
+        # retira da mp só os quadros do próprio processo (as páginas vão para o swap)
+        self.MP.swapOutProcess(process)
 
     def executeProcess(self, process):
-        for p in self.images:
-            if (p.state == 'executing'):  # assumindo aqui que sistema tem só 1 processador
-                p.state = 'ready'  # e que só tem, em um dado momento, 1 processo executando
-        process.state = 'executing'  # mas tem grande chance disso tar errado, ent sla
-
-    def getProcess(self, processname): # função q pega o nome de um processo e busca os dados do processo 
-        for process in self.images:
-            if (process.name == processname):
-                return process
-        print(' Process not found in memory!')
-        return None
+        core = self.activeCore
+        if process is not core.runningProcess:  # troca de contexto no núcleo
+            if core.runningProcess is not None:
+                self.contextSwitches += 1
+                core.contextSwitches += 1
+            if self.MP.tlb is not None:  # a TLB simulada é uma só, compartilhada pelos núcleos
+                self.MP.tlb.flush()
+            # na ordem do input só há 1 processador: só o processo que rodava antes pode estar
+            # 'executando'. Com escalonador, quem sai da CPU já deixa de executar (ver leaveCPU)
+            if (self.scheduler is None and core.runningProcess is not None and
+                    core.runningProcess.state == 'executing'):
+                core.runningProcess.state = 'ready'
+            core.runningProcess = process
+        self.runningProcess = process
+        process.state = 'executing'
+
+    def printPageTableStats(self):
+        # Custo de memória e de tradução das tabelas de páginas dos processos
+        for process in self.images.values():
+            stats = process.pageTable.stats()
+            log(INFO, 'Page table of %s (%s): %s bytes, %s lookups, %.2f memory accesses per lookup.',
+                process.name, stats['layout'], stats['overheadBytes'], stats['lookups'],
+                stats['averageLookupCost'])
+            if stats['directoryBytes']:
+                log(INFO, ' (%s of those bytes are the software page directory, one entry per page of the process)',
+                    stats['directoryBytes'])
+        if self.configuration.invertedPageTable is not None:
+            log(INFO, 'Global inverted page table: %s bytes.',
+                self.configuration.invertedPageTable.overheadBytes())
+
+    def printReports(self):
+        # Relatórios das partes opcionais que estavam ligadas (ou foram usadas) nesta simulação
+        MP = self.MP
+        for component in (MP.tlb, MP.readahead, MP.writeBackDaemon, MP.compressedPool, MP.loadControl):
+            if component is not None:
+                component.printStats()
+        if self.configuration.pageTableLayout != 'flat':
+            self.printPageTableStats()
+        if MP.pagesSharedByFork or MP.cowCopies or MP.sharedSegments:
+            MP.printSharingStats()
+        if self.scheduler is not None:
+            self.printSchedulingStats()
+        configuration = self.configuration
+        if configuration.deviceSpecs or configuration.dmaChannels or configuration.programmedIOTime:
+            self.printIOStats()
+
+    def getProcess(self, processname): # função q pega o nome de um processo e busca os dados do processo
+        process = self.images.get(processname)
+        if process is None:
+            log(INFO, ' Process not found in memory!')
+        return process
+
+
+def measureSpeedup(makeConfiguration, input, maxCores):
+    # Roda o mesmo input com 1..maxCores núcleos e compara o makespan com o de 1 núcleo.
+    # 'makeConfiguration(cores)' deve devolver uma configuração nova (MP e MS próprias) a cada chamada.
+    # As execuções rodam sem mensagens
+    curve = []
+    previous = setEventSink(NullSink())
+    try:
+        for cores in range(1, maxCores + 1):
+            configuration = makeConfiguration(cores)
+            try:
+                simulator = Simulator(configuration)
+                simulator.simulate(input)
+            finally:
+                configuration.MS.close()
+            stats = simulator.schedulingStats()
+            makespan = stats.get('makespan', 0)
+            if not curve:
+                base = makespan
+            curve.append({'cores': cores, 'makespan': makespan,
+                          'speedup': base / makespan if makespan else 0.0,
+                          'utilization': sum(c['utilization'] for c in stats['cores']) / cores,
+                          'migrations': stats['migrations'],
+                          'faults': simulator.MP.replacementPolicy.faults})
+    finally:
+        setEventSink(previous)
+    return curve
+
+
+def printSpeedupCurve(curve):
+    for point in curve:
+        log(INFO, '%s cores: makespan %s u.t, speedup %.2fx, average utilization %.1f%%, %s migrations, %s '
+                  'page faults.',
+            point['cores'], point['makespan'], point['speedup'], point['utilization']*100,
+            point['migrations'], point['faults'])
 
 
 class Input:
@@ -608,23 +3392,144 @@ class Input:
             s+= i.toString() + '; '
         return s
 
+    def __str__(self):  # usado nas mensagens de log()
+        return self.toString()
+
 class Configuration:
 
     
-    def __init__(self, _memorySizeInInts, _numberOfFramesInMemory, _secondaryMemoryScalingFactor):
+    def __init__(self, _memorySizeInInts, _numberOfFramesInMemory, _secondaryMemoryScalingFactor,
+                 _replacementPolicy='LRU', _swapFilePath=None, _pageTableLayout='flat',
+                 _pageTableLevels=2, _logicalAddressBits=None, _demandPaging=False,
+                 _schedulingPolicy=None, _quantum=2, _cores=1):
+        # Opções inválidas são recusadas aqui, antes de criar a MP e o arquivo de swap
+        if _memorySizeInInts <= 0 or _numberOfFramesInMemory <= 0:
+            raise ValueError('Memory size and number of frames must be positive')
+        if _schedulingPolicy is not None:
+            makeSchedulingPolicy(_schedulingPolicy, _quantum)  # só valida o nome (o Simulator cria as filas)
+        elif _cores > 1:
+            raise ValueError('Running on ' + str(_cores) + ' cores needs a scheduling policy')
         self.memorySizeInInts = _memorySizeInInts
         self.numberOfFramesInMemory = _numberOfFramesInMemory
         self.averageIOTime = 3 #in u.t
+        self.timerInterval = 1  # período da interrupção de relógio, in u.t
+        # E/S: modelos de latência e canais de DMA por dispositivo (ver configureDevice). Sem DMA,
+        # a CPU gasta programmedIOTime u.t por bloco copiado (0: cópia de graça, como antes)
+        self.programmedIOTime = 0
+        self.seed = DEFAULT_SEED  # semente base dos geradores (cada dispositivo deriva a sua, ver deviceSeed)
+        self.deviceSpecs = {}  # id do dispositivo -> (modelo de latência, canal, blocos por E/S)
+        self.dmaChannels = {}  # nome -> DMAChannel
+        # Política de escalonamento da CPU (ver SCHEDULING_POLICIES); None: ordem do input
+        self.schedulingPolicy = _schedulingPolicy
+        self.quantum = _quantum  # in u.t (RR, e quantum do nível mais alto do MLFQ)
+        self.cores = _cores  # núcleos de CPU simulados (mais de 1 precisa de política de escalonamento)
+        # Paginação por demanda: páginas só vão para a MP no primeiro acesso (ver Process.getPage)
+        self.demandPaging = _demandPaging
         self.logicalAdressSize = 1 #In this case, means one int. It could be less or more though, but one makes it more convenient.
         self.numberOfIntsPerFrame = math.ceil(
             _memorySizeInInts/_numberOfFramesInMemory)  # arrendonda pra cima
 
-        self.pageTable = PageTable()  # Aqui você instancia a tabela de páginas
+        # Política de substituição de páginas da MP (ver REPLACEMENT_POLICIES)
+        self.replacementPolicy = _replacementPolicy
         self.MP = Memory(_memorySizeInInts, _numberOfFramesInMemory,
-                         self.numberOfIntsPerFrame, self.pageTable)
+                         self.numberOfIntsPerFrame,
+                         makeReplacementPolicy(_replacementPolicy, _numberOfFramesInMemory))
 
         self.MS = SecondaryMemory(_memorySizeInInts*_secondaryMemoryScalingFactor,
-                                  _numberOfFramesInMemory*_secondaryMemoryScalingFactor, self.numberOfIntsPerFrame)
+                                  _numberOfFramesInMemory*_secondaryMemoryScalingFactor, self.numberOfIntsPerFrame,
+                                  _swapFilePath, _demandPaging)
+        self.MP.attachSecondaryMemory(self.MS)
+
+        # Organização das tabelas de páginas dos processos (ver PAGE_TABLE_LAYOUTS)
+        if _pageTableLayout.lower() not in PAGE_TABLE_LAYOUTS:
+            raise ValueError('Unknown page table layout: ' + str(_pageTableLayout) +
+                             ' (available: ' + ', '.join(PAGE_TABLE_LAYOUTS) + ')')
+        self.pageTableLayout = _pageTableLayout.lower()
+        self.pageTableLevels = _pageTableLevels
+        # Tamanho do espaço de endereçamento lógico em bits (None: só o tamanho do processo importa)
+        self.logicalAddressBits = _logicalAddressBits
+        self.invertedPageTable = None
+        if self.pageTableLayout == 'inverted':
+            self.invertedPageTable = InvertedPageTable(_numberOfFramesInMemory)
+            self.MP.invertedPageTable = self.invertedPageTable
+
+    def virtualPageBits(self, process):
+        # Bits do número da página virtual: do espaço lógico configurado, ou do tamanho do processo
+        if self.logicalAddressBits is not None:
+            offsetBits = (self.numberOfIntsPerFrame - 1).bit_length()
+            return max(1, self.logicalAddressBits - offsetBits)
+        pages = math.ceil(process.size / self.numberOfIntsPerFrame)
+        return max(1, pages.bit_length())
+
+    def newPageTable(self, process):
+        if self.pageTableLayout == 'multilevel':
+            return MultiLevelPageTable(self.virtualPageBits(process), self.pageTableLevels)
+        if self.pageTableLayout == 'inverted':
+            return HashedPageTable(process, self.invertedPageTable)
+        return PageTable()
+
+    def enableWriteBack(self, _highWatermark, _lowWatermark, _interval=0, _batchSize=32):
+        # Liga o daemon de write-back em lote das páginas sujas (desligado por padrão)
+        self.MP.writeBackDaemon = WriteBackDaemon(self.MP, _highWatermark, _lowWatermark,
+                                                  _interval, _batchSize)
+        return self.MP.writeBackDaemon
+
+    def enableTLB(self, _size, _associativity=None, _replacement='LRU', _seed=None):
+        # Liga a TLB na tradução de endereços (desligada por padrão)
+        # uma falta na TLB custa uma caminhada na tabela de páginas do layout escolhido
+        walk = 1
+        if self.pageTableLayout == 'multilevel':
+            walk = self.pageTableLevels
+        elif self.pageTableLayout == 'inverted':
+            walk = 2  # âncora + entrada (cadeias de tamanho ~1)
+        if _seed is None:
+            _seed = self.seed
+        self.MP.tlb = TLB(_size, _associativity, _replacement, _seed, _pageWalkAccesses=walk)
+        return self.MP.tlb
+
+    def enableReadahead(self, _initialWindow=2, _maxWindow=32):
+        # Liga a leitura antecipada de páginas em acessos sequenciais (desligada por padrão)
+        self.MP.readahead = ReadaheadEngine(self.MP, _initialWindow, _maxWindow)
+        return self.MP.readahead
+
+    def enableLoadControl(self, _window=32, _pffInterval=20, _pffHigh=0.5, _readmitFraction=0.8,
+                          _sampleInterval=10, _historyLength=100):
+        # Liga o controle de carga por conjunto de trabalho/PFF (desligado por padrão)
+        self.MP.loadControl = LoadController(self, _window, _pffInterval, _pffHigh,
+                                             _readmitFraction, _sampleInterval, _historyLength)
+        return self.MP.loadControl
+
+    def enableCompressedSwap(self, _budgetBytes, _algorithm='zlib', _level=1, _poolLoadTime=5,
+                             _secondaryLoadTime=1000):
+        # Liga o pool de swap comprimido entre a MP e a MS (desligado por padrão)
+        self.MP.compressedPool = CompressedSwapPool(self.MP, _budgetBytes, _algorithm, _level,
+                                                    _poolLoadTime, _secondaryLoadTime)
+        return self.MP.compressedPool
+
+    def addDMAChannel(self, _name, _bandwidth):
+        # Cria um canal de DMA com banda de '_bandwidth' ints por u.t (blocos do tamanho de uma página)
+        channel = self.dmaChannels[_name] = DMAChannel(_name, _bandwidth, self.numberOfIntsPerFrame)
+        return channel
+
+    def configureDevice(self, _deviceId, _latency=None, _channel=None, _blocks=1):
+        # Modelo de latência (ver LATENCY_MODELS), canal de DMA (nome ou DMAChannel) e blocos por
+        # requisição de um dispositivo; dispositivos não configurados levam averageIOTime u.t
+        if isinstance(_channel, str):
+            _channel = self.dmaChannels[_channel]
+        self.deviceSpecs[deviceKey(str(_deviceId))] = (_latency, _channel, _blocks)
+
+    def newDevice(self, key):
+        latency, channel, blocks = self.deviceSpecs.get(key, (None, None, 1))
+        if latency is None:
+            latency = ConstantLatency(self.averageIOTime)
+        elif latency.seed is None:
+            latency.reseed(self.deviceSeed(key))
+        return ioDevice(key, latency, channel, blocks)
+
+    def deviceSeed(self, key):
+        # Semente do gerador de um dispositivo: a semente base mais o id dele (uma string dá a mesma
+        # semente em toda execução, diferente do hash(), que muda a cada processo)
+        return str(self.seed) + ':' + str(key)
 
     def setSimulation(self, _simulator):
         self.simulator = _simulator
@@ -642,9 +3547,28 @@ class Instruction:
             s+= ' ' + k
         return s
 
+    def __str__(self):  # usado nas mensagens de log()
+        return self.toString()
+
+
+# Quantidade de argumentos (mínimo, máximo) aceita por instrução; fora disso a instrução é ignorada.
+# Máximo None: argumentos a mais são ignorados (o input.txt original tem 'P3 R 4 4')
+INSTRUCTION_ARITY = {
+    'C': (1, None),  # 'P1 C 32 [prioridade]'
+    'F': (1, None),  # 'P2 F P1'
+    'R': (1, None),  # 'P1 R 4'
+    'W': (2, None),  # 'P1 W 4 10'
+    'P': (1, None),  # 'P1 P 4'
+    'I': (1, None),  # 'P1 I disco'
+    'G': (2, 2),  # 'P1 G seg 64'
+    'A': (1, 2),  # 'P1 A seg [endereço]'
+    'D': (1, 1),  # 'P1 D seg'
+}
+
 
 class FileReader:
-    def readInputFromFile(self, encoding='utf-16'):
+    def readInputFromFile(self, encoding='utf-16', strict=False):
+        # strict: arquivo inexistente é um erro (OSError) em vez de um input vazio
         instructions = []
 
         try:
@@ -667,11 +3591,13 @@ class FileReader:
                         instructions.append(instruction)
                     else:
                         # Se o formato da instrução for inválido, imprime uma mensagem de erro
-                        print("Invalid instruction format:", line)
+                        log(WARNING, 'Invalid instruction format: %s', line)
 
         except FileNotFoundError:
+            if strict:
+                raise
             # Se o arquivo não for encontrado, imprime uma mensagem de erro
-            print("File not found:", self.filePath)
+            log(WARNING, 'File not found: %s', self.filePath)
 
         return Input(instructions)
 
@@ -682,17 +3608,26 @@ class FileReader:
     def printInput(self, instrucoes):
         # Exibindo as instruções lidas
         for instrucao in instrucoes:
-            print("Processo:" + instrucao.process_name + ", Ação:" +
-                  instrucao.action + " Argumentos: " + instrucao.args)
+            log(INFO, 'Processo:%s, Ação:%s Argumentos: %s',
+                instrucao.process_name, instrucao.action, instrucao.args)
+
 
+def describeConfiguration(configuration):
+    log(INFO, '\nMP Size In Ints: %s Ints', configuration.MP.size)
+    log(INFO, 'Amount of Frames In MP: %s Frames', configuration.MP.pageQuantity)
+    log(INFO, 'Size of a Page: %s Ints', configuration.MP.frames[0].size)
 
-config = Configuration(128, 16, 8)
-print('\nMP Size In Ints: ' + str(config.MP.size) + ' Ints')
-print('Amount of Frames In MP: ' + str(config.MP.pageQuantity) + ' Frames')
-print('Size of a Page: '+str(config.MP.frames[0].size) + ' Ints')
 
+def defaultConfiguration():
+    # Configuração usada nos testes abaixo: MP de 128 ints em 16 quadros, MS 8x maior
+    configuration = Configuration(128, 16, 8)
+    describeConfiguration(configuration)
+    return configuration
 
-def runPagingTest():
+
+def runPagingTest(config=None):
+    if config is None:
+        config = defaultConfiguration()
     p1 = Process('P1', 'New', 16, config)
     p2 = Process('P2', 'New', 16, config)
     p3 = Process('P3', 'New', 17, config)
@@ -704,21 +3639,195 @@ def runPagingTest():
     p3 = Process('P8', 'New', 8, config)
     #p3 = Process('P9', 'New', 8, config)
     config.MP.printMemory()
-    print('\nPaging/Virtual Memory test concluded succesfully.\n\n---\n')
+    log(INFO, '\nPaging/Virtual Memory test concluded succesfully.\n\n---\n')
 
-def runSimulatorTest():
-    print('Beggining Simulator test.\n')
+def runSimulatorTest(config=None, inputPath='input.txt'):
+    if config is None:
+        config = defaultConfiguration()
+    log(INFO, 'Beggining Simulator test.\n')
     #inputInstructions = Input([Instruction('P1','C','32'),Instruction('P2','C','64'),Instruction('P3','C','16'),Instruction('P1','R','31')])
     simulator = Simulator(config)
     fileReader = FileReader()
+    fileReader.filePath = inputPath
     inputInstructions = fileReader.readInputFromFile()
-    print('Chosen Instructions:', inputInstructions.toString(), '\n')
+    log(INFO, 'Chosen Instructions: %s \n', inputInstructions)
     simulator.simulate(inputInstructions)
     config.MP.printMemory()
     config.MP.printMemoryStatus()
-    print('\nSimulator test concluded succesfully.\n\n---\n')
-
-#Testes do sistema:
-#runPagingTest()  # Rodem um teste ou outro, mas nn os dois pfvr
-runSimulatorTest()
-
+    config.MP.printReplacementStats()
+    config.MS.printStats()
+    simulator.printReports()
+    log(INFO, '\nSimulator test concluded succesfully.\n\n---\n')
+    return inputInstructions
+
+
+BATCH_FIELDS = ('trace', 'instructions', 'instructionsExecuted', 'instructionsSkipped', 'ticks',
+                'pageFaults', 'evictions', 'dirtyWriteBacks', 'swapPagesWritten', 'swapPagesRead',
+                'ioRequests', 'ioWaits', 'ioWaitTime', 'contextSwitches', 'migrations', 'makespan',
+                'averageTurnaround', 'averageWaiting', 'averageResponse', 'throughput', 'wallSeconds',
+                'instructionsPerSecond', 'ticksPerSecond', 'error')
+
+
+def runStats(simulator, trace, instructions, wallSeconds):
+    # Estatísticas de uma execução em lote (uma linha do JSON/CSV, campos em BATCH_FIELDS).
+    # As métricas de escalonamento ficam vazias (None) na ordem do input, sem escalonador
+    MP = simulator.MP
+    scheduling = simulator.schedulingStats() if simulator.scheduler is not None else {}
+    devices = simulator.deviceStats().values()
+    dirtyWriteBacks = MP.faultPathWrites
+    if MP.writeBackDaemon is not None:
+        dirtyWriteBacks += MP.writeBackDaemon.pagesFlushed
+    return {'trace': trace, 'instructions': instructions,
+            'instructionsExecuted': simulator.instructionsExecuted,
+            'instructionsSkipped': simulator.instructionsSkipped,
+            'ticks': simulator.timeSinceStart,
+            'pageFaults': MP.replacementPolicy.faults, 'evictions': MP.replacementPolicy.evictions,
+            'dirtyWriteBacks': dirtyWriteBacks,
+            'swapPagesWritten': simulator.MS.pagesWritten, 'swapPagesRead': simulator.MS.pagesRead,
+            'ioRequests': sum(d['uses'] + d['queueDepth'] for d in devices),
+            'ioWaits': sum(d['waits'] for d in devices),
+            'ioWaitTime': sum(d['averageWait']*d['waits'] for d in devices),
+            'contextSwitches': simulator.contextSwitches,
+            'migrations': simulator.migrations, 'makespan': scheduling.get('makespan'),
+            'averageTurnaround': scheduling.get('averageTurnaround'),
+            'averageWaiting': scheduling.get('averageWaiting'),
+            'averageResponse': scheduling.get('averageResponse'),
+            'throughput': scheduling.get('throughput'),
+            'wallSeconds': wallSeconds,
+            'instructionsPerSecond': simulator.instructionsExecuted / wallSeconds if wallSeconds else 0.0,
+            'ticksPerSecond': simulator.timeSinceStart / wallSeconds if wallSeconds else 0.0,
+            'error': None}
+
+
+def runBatch(traces, makeConfiguration):
+    # Roda cada trace numa configuração nova, sem mensagens (só os avisos, na saída de erro),
+    # e retorna as estatísticas de cada execução. Um trace que não pode ser lido ou que falha no meio
+    # (ex: 'P1 W abc 3') não interrompe os outros: a linha dele só tem o trace e o erro
+    import time
+    previous = setEventSink(TextSink(WARNING, sys.stderr))
+    try:
+        results = []
+        for trace in traces:
+            fileReader = FileReader()
+            fileReader.filePath = trace
+            try:
+                inputInstructions = fileReader.readInputFromFile(strict=True)
+            except OSError as error:
+                results.append(failedRun(trace, None, error))
+                continue
+            configuration = makeConfiguration()
+            try:
+                simulator = Simulator(configuration)
+                start = time.perf_counter()
+                simulator.simulate(inputInstructions)
+                wallSeconds = time.perf_counter() - start
+                results.append(runStats(simulator, trace, len(inputInstructions.instructions), wallSeconds))
+            except Exception as error:  # qualquer erro do conteúdo do trace fica só na linha dele
+                results.append(failedRun(trace, len(inputInstructions.instructions), error))
+            finally:
+                configuration.MS.close()
+        return results
+    finally:
+        setEventSink(previous)
+
+
+def failedRun(trace, instructions, error):
+    # Linha do lote de um trace que não rodou até o fim (os outros campos ficam vazios)
+    message = type(error).__name__ + ': ' + str(error)
+    log(WARNING, 'Trace %s failed: %s', trace, message)
+    return {'trace': trace, 'instructions': instructions, 'error': message}
+
+
+def writeBatchResults(results, format, stream):
+    if format == 'csv':
+        import csv
+        writer = csv.DictWriter(stream, fieldnames=BATCH_FIELDS, lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(results)
+    else:
+        import json
+        json.dump(results, stream, indent=2)
+        stream.write('\n')
+
+
+def main(argv=None):
+    # Ponto de entrada da linha de comando: o import do módulo não roda nada (a GUI e outras
+    # ferramentas só importam as classes); os testes rodam só quando o arquivo é executado.
+    # Com --format, roda os traces em lote, sem mensagens, e escreve as estatísticas em JSON/CSV
+    import argparse
+
+    def positiveInt(text):
+        value = int(text)  # ValueError vira 'invalid positiveInt value' no argparse
+        if value <= 0:
+            raise argparse.ArgumentTypeError('must be a positive integer: ' + text)
+        return value
+
+    parser = argparse.ArgumentParser(description='Simulador de SO (memória virtual e escalonamento).')
+    parser.add_argument('input', nargs='*', default=['input.txt'],
+                        help='arquivo(s) de instruções (padrão: input.txt)')
+    parser.add_argument('--paging-test', action='store_true',
+                        help='roda o teste de paginação em vez de simular o input')
+    parser.add_argument('--format', choices=('json', 'csv'),
+                        help='modo em lote: estatísticas de cada trace em JSON ou CSV')
+    parser.add_argument('--output', help='arquivo de saída do modo em lote (padrão: saída padrão)')
+    parser.add_argument('--memory', type=positiveInt, default=128, help='tamanho da MP em ints (padrão: 128)')
+    parser.add_argument('--frames', type=positiveInt, default=16, help='quadros da MP (padrão: 16)')
+    parser.add_argument('--scaling', type=positiveInt, default=8,
+                        help='quantas vezes a MS é maior que a MP (padrão: 8)')
+    parser.add_argument('--policy', default='LRU',
+                        help='substituição de páginas: ' + ', '.join(REPLACEMENT_POLICIES))
+    parser.add_argument('--scheduler', help='escalonamento: ' + ', '.join(SCHEDULING_POLICIES) +
+                        ' (padrão: ordem do input)')
+    parser.add_argument('--quantum', type=positiveInt, default=2)
+    parser.add_argument('--cores', type=positiveInt, default=1)
+    parser.add_argument('--demand-paging', action='store_true')
+    parser.add_argument('--speedup', action='store_true',
+                        help='com --scheduler: mostra a curva de speedup de 1 a --cores núcleos')
+    args = parser.parse_args(argv)
+    if args.speedup and args.scheduler is None:
+        parser.error('--speedup needs a --scheduler')
+
+    def makeConfiguration(cores=None):
+        return Configuration(args.memory, args.frames, args.scaling, args.policy,
+                             _demandPaging=args.demand_paging, _schedulingPolicy=args.scheduler,
+                             _quantum=args.quantum, _cores=args.cores if cores is None else cores)
+
+    # valida as opções uma vez, antes de rodar qualquer coisa (em lote ou no console)
+    previous = setEventSink(NullSink())
+    try:
+        makeConfiguration().MS.close()
+    except ValueError as error:  # configuração inválida (política desconhecida, etc.)
+        parser.error(str(error))
+    finally:
+        setEventSink(previous)
+
+    if args.format is not None:
+        results = runBatch(args.input, makeConfiguration)
+        if args.output is None:
+            writeBatchResults(results, args.format, sys.stdout)
+        else:
+            with open(args.output, 'w', newline='') as stream:
+                writeBatchResults(results, args.format, stream)
+        return 1 if any(result['error'] is not None for result in results) else 0
+    #Testes do sistema:
+    previous = setEventSink(TextSink())  # no console, todas as mensagens vão para a saída padrão
+    try:
+        if args.paging_test:  # Rodem um teste ou outro, mas nn os dois pfvr
+            config = makeConfiguration()
+            describeConfiguration(config)
+            runPagingTest(config)
+        else:
+            for inputPath in args.input:
+                config = makeConfiguration()
+                describeConfiguration(config)
+                inputInstructions = runSimulatorTest(config, inputPath)
+                if args.speedup:
+                    log(INFO, 'Speedup of %s from 1 to %s cores:', inputPath, args.cores)
+                    printSpeedupCurve(measureSpeedup(makeConfiguration, inputInstructions, args.cores))
+    finally:
+        setEventSink(previous)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
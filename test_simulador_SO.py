@@ -0,0 +1,157 @@
+# Testes do simulador com traces pequenos e determinísticos (rodar com: python -m pytest)
+import json
+
+import pytest
+
+import simulador_SO as S
+from simulador_SO import Instruction as I
+
+
+@pytest.fixture(autouse=True)
+def silencioso():
+    previous = S.setEventSink(S.NullSink())
+    yield
+    S.setEventSink(previous)
+
+
+def simular(instrucoes, configuration):
+    simulator = S.Simulator(configuration)
+    simulator.simulate(S.Input(instrucoes))
+    return simulator
+
+
+def test_dma_dispositivo_lento_nao_segura_o_canal():
+    # disco lento (100 u.t) e disco rápido (1 u.t) no mesmo canal: a transferência do rápido
+    # acontece logo, no intervalo em que o canal está livre, em vez de esperar a do lento
+    configuration = S.Configuration(128, 16, 8)
+    configuration.addDMAChannel('ch0', 8)
+    configuration.configureDevice('lento', S.makeLatencyModel('constant', 100), 'ch0', 1)
+    configuration.configureDevice('rapido', S.makeLatencyModel('constant', 1), 'ch0', 1)
+    simulator = simular([I('P1', 'C', '8'), I('P2', 'C', '8'), I('P1', 'I', 'lento'),
+                         I('P2', 'I', 'rapido'), I('P2', 'R', '0'), I('P1', 'R', '0')], configuration)
+    channel = configuration.dmaChannels['ch0']
+    assert channel.queueDelay == 0
+    assert channel.transfers == 2
+    devices = simulator.deviceStats()
+    assert devices['rapido']['busyTime'] == 2  # latência + 1 bloco
+    assert devices['lento']['busyTime'] == 101
+
+
+def test_dispositivos_com_a_mesma_distribuicao_tem_sementes_proprias():
+    def sorteios():
+        configuration = S.Configuration(128, 16, 8)
+        for device in ('a', 'b'):
+            configuration.configureDevice(device, S.makeLatencyModel('exponential', 10))
+        a, b = configuration.newDevice('a'), configuration.newDevice('b')
+        return [a.latency.sample() for _ in range(20)], [b.latency.sample() for _ in range(20)]
+
+    primeira = sorteios()
+    assert primeira[0] != primeira[1]  # sem correlação entre os dispositivos
+    assert sorteios() == primeira  # e reproduzível
+
+
+class Registro(S.EventSink):
+    # Guarda as mensagens INFO da simulação (dados lidos, instruções executadas)
+    def __init__(self):
+        super().__init__(S.INFO)
+        self.mensagens = []
+
+    def emit(self, level, message):
+        self.mensagens.append(message.strip())
+
+
+def simularRegistrando(instrucoes, configuration):
+    registro = Registro()
+    previous = S.setEventSink(registro)
+    try:
+        simular(instrucoes, configuration)
+    finally:
+        S.setEventSink(previous)
+    return registro.mensagens
+
+
+# sequência de Belady (páginas 1 a 5, 3 molduras): contagens clássicas de faltas
+BELADY = [1, 2, 3, 4, 1, 2, 5, 1, 2, 3, 4, 5]
+
+
+def faltas(policy, instrucoes):
+    configuration = S.Configuration(12, 3, 8, policy, _demandPaging=True)
+    simular(instrucoes, configuration)
+    return configuration.MP.replacementPolicy.faults
+
+
+@pytest.mark.parametrize('policy, esperado', [('LRU', 10), ('FIFO', 9), ('OPT', 7)])
+def test_faltas_da_sequencia_de_belady(policy, esperado):
+    instrucoes = [I('P1', 'C', '20')] + [I('P1', 'R', str((page - 1)*4)) for page in BELADY]
+    assert faltas(policy, instrucoes) == esperado
+
+
+def test_opt_nunca_tem_mais_faltas_que_as_outras_politicas():
+    # dois processos, um fork (páginas compartilhadas por COW) e um segmento compartilhado
+    instrucoes = [I('P1', 'C', '16'), I('P1', 'G', 'seg', '8'), I('P1', 'A', 'seg'),
+                  I('P2', 'F', 'P1'), I('P3', 'C', '12')]
+    for i in range(24):
+        process = ('P1', 'P2', 'P3')[i % 3]
+        address = str((i*7) % 12)
+        if i % 4 == 0:
+            instrucoes.append(I(process, 'W', address, str(i)))
+        else:
+            instrucoes.append(I(process, 'R', address))
+    opt = faltas('OPT', instrucoes)
+    for policy in S.REPLACEMENT_POLICIES:
+        assert opt <= faltas(policy, instrucoes), policy
+
+
+@pytest.mark.parametrize('comprimido', [False, True])
+def test_pagina_despejada_volta_com_o_que_foi_escrito(comprimido):
+    # 2 molduras e 4 páginas: as páginas escritas são despejadas e depois lidas de volta do swap
+    # (ou do pool comprimido, que fica entre a MP e o swap)
+    configuration = S.Configuration(8, 2, 4)
+    if comprimido:
+        pool = configuration.enableCompressedSwap(1 << 16)
+    mensagens = simularRegistrando([I('P1', 'C', '16'), I('P1', 'W', '0', '7'), I('P1', 'W', '5', '-9'),
+                                    I('P1', 'R', '9'), I('P1', 'R', '13'), I('P1', 'R', '0'),
+                                    I('P1', 'R', '5')], configuration)
+    lidos = [m for m in mensagens if m.startswith('Requested data')]
+    assert lidos[-2:] == ['Requested data is: <<7>>', 'Requested data is: <<-9>>']
+    if comprimido:
+        assert pool.hits == 2
+        assert configuration.MS.pagesRead == 0
+    else:
+        assert configuration.MS.pagesWritten == 2
+        assert configuration.MS.pagesRead == 2
+
+
+def ordemDeExecucao(policy):
+    # P1 (prioridade 2) chega antes de P2 (prioridade 1); cada um roda 3 instruções de CPU
+    configuration = S.Configuration(64, 8, 4, _schedulingPolicy=policy, _quantum=2)
+    instrucoes = ([I('P1', 'C', '8', '2'), I('P2', 'C', '8', '1')] +
+                  [I(process, 'P', '0') for process in ('P1', 'P2') for _ in range(3)] +
+                  [I('P1', 'T'), I('P2', 'T')])
+    mensagens = simularRegistrando(instrucoes, configuration)
+    return [m.split()[2] for m in mensagens if m.startswith('Running instruction')]
+
+
+def test_round_robin_alterna_a_cada_quantum():
+    assert ordemDeExecucao('RR') == ['P1', 'P1', 'P2', 'P2', 'P1', 'P1', 'P2', 'P2', 'P1', 'P2']
+
+
+def test_prioridade_preempta_e_roda_o_mais_prioritario_ate_o_fim():
+    assert ordemDeExecucao('PRIORITY') == ['P1'] + ['P2']*5 + ['P1']*4
+
+
+def test_lote_sai_com_status_1_se_algum_trace_falhar(tmp_path, capsys):
+    bom = tmp_path / 'bom.txt'
+    bom.write_text('P1 C 32\nP1 W 4 10\nP1 R 4\nP1 T\n')
+    ruim = tmp_path / 'ruim.txt'
+    ruim.write_text('P1 C 32\nP1 W abc 3\n')
+    inexistente = tmp_path / 'inexistente.txt'
+    assert S.main(['--format', 'json', str(bom)]) == 0
+    capsys.readouterr()
+    # um trace que falha (ou nem existe) não derruba os outros, mas a linha dele tem o erro
+    assert S.main(['--format', 'json', str(bom), str(ruim), str(inexistente)]) == 1
+    linhas = json.loads(capsys.readouterr().out)
+    assert [linha['trace'] for linha in linhas] == [str(bom), str(ruim), str(inexistente)]
+    assert linhas[0]['error'] is None and linhas[0]['instructionsExecuted'] == 4
+    assert linhas[1]['error'].startswith('ValueError')
+    assert linhas[2]['error'].startswith('FileNotFoundError')